@@ -0,0 +1,191 @@
+import os
+
+# Render into an off-screen surface so the benchmarks run without a window, and keep
+# pygame's banner out of the JSON report
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from game.actions import apply_action, TOOL_BASE
+from game.clock import ManualClock
+from game.config import GameConfig
+from game.engine import GameEngine
+from game.ui import GameUI
+
+
+#### Scenarios: each one puts a fresh engine into the state to measure
+
+def early_game(engine):
+    pass
+
+def late_game(engine):
+    engine.run_for(600)
+
+def max_intelligence(engine):
+    if engine.config.FLEET_SIZE > 1:
+        engine.ai_system.intelligences[:] = engine.config.MAX_AI_INTELLIGENCE
+    else:
+        engine.ai_system.intelligence = engine.config.MAX_AI_INTELLIGENCE
+
+def all_tools(engine):
+    engine.money = engine.research_points = 1e9
+    for i in range(len(engine.tool_manager.tool_names)):
+        apply_action(engine, TOOL_BASE + i)
+    engine.purchase_railguards()
+
+SCENARIOS = {
+    'early_game': early_game,
+    'late_game': late_game,
+    'max_intelligence': max_intelligence,
+    'all_tools': all_tools,
+}
+
+
+def make_engine(config, scenario, seed=0):
+    clock = ManualClock()
+    engine = GameEngine(config, clock=clock, seed=seed)
+    SCENARIOS[scenario](engine)
+    return engine, clock
+
+
+def _rate(run, seconds):
+    # Calls `run()` until `seconds` have passed; returns units per second
+    units = 0
+    start = time.perf_counter()
+    while True:
+        units += run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return units / elapsed
+
+
+def bench_update(config, scenario, seconds):
+    """Simulation ticks per second through GameEngine.update with a 60 FPS fake clock."""
+    engine, clock = make_engine(config, scenario)
+
+    def run():
+        ticks = engine.tick_count
+        clock.advance(1 / 60)
+        # update() stops once the AI goes rogue; keep the game running to measure the tick cost
+        engine.game_over = False
+        engine.update()
+        return engine.tick_count - ticks
+    return _rate(run, seconds)
+
+def bench_patterns(config, scenario, seconds):
+    """Calls per second of AISystem._generate_behavior_patterns."""
+    ai_system = make_engine(config, scenario)[0].ai_system
+
+    def run():
+        ai_system._generate_behavior_patterns()
+        return 1
+    return _rate(run, seconds)
+
+def bench_frames(config, scenario, seconds, ui):
+    """Frames per second of update + get_game_state + render, as in the main loop."""
+    engine, clock = make_engine(config, scenario)
+    ui.invalidate()
+
+    def run():
+        clock.advance(1 / 60)
+        engine.game_over = False
+        engine.update()
+        ui.render(engine.get_game_state())
+        return 1
+    return _rate(run, seconds)
+
+def bench_full_redraw(config, scenario, seconds, ui):
+    """Frames per second of GameUI.render when every frame is a full redraw."""
+    game_state = make_engine(config, scenario)[0].get_game_state()
+
+    def run():
+        ui.invalidate()
+        ui.render(game_state)
+        return 1
+    return _rate(run, seconds)
+
+
+def run_benchmarks(scenarios, seconds=1.0, repeat=3, fleet_size=1):
+    """{scenario: {metric: best rate over `repeat` runs}}"""
+    pygame.init()
+    config = GameConfig()
+    config.FLEET_SIZE = fleet_size
+    ui = GameUI(config)
+    results = {}
+    for scenario in scenarios:
+        metrics = {
+            'update_ticks_per_sec': lambda: bench_update(config, scenario, seconds),
+            'frames_per_sec': lambda: bench_frames(config, scenario, seconds, ui),
+            'full_redraw_frames_per_sec': lambda: bench_full_redraw(config, scenario, seconds, ui),
+        }
+        # A fleet draws anomaly counts directly instead of generating behavior patterns
+        if fleet_size == 1:
+            metrics['patterns_per_sec'] = lambda: bench_patterns(config, scenario, seconds)
+        results[scenario] = {name: max(bench() for _ in range(repeat)) for name, bench in metrics.items()}
+    pygame.quit()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Relative change of every metric against `baseline`; regressions are slower by more than `threshold`."""
+    changes, regressions = {}, []
+    for scenario, metrics in results.items():
+        for name, value in metrics.items():
+            base = baseline.get(scenario, {}).get(name)
+            if not base:
+                continue
+            change = value / base - 1
+            changes[f"{scenario}.{name}"] = change
+            if change < -threshold:
+                regressions.append(f"{scenario}.{name}")
+    return changes, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks of the AI Overseer update and render paths.")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time budget of each measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="Measurements per metric; the best one is kept")
+    parser.add_argument("--fleet-size", type=int, default=1, help="Number of AI systems overseen (GameConfig.FLEET_SIZE)")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", default=None, metavar="BASELINE", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'numpy': np.__version__,
+        'seconds': args.seconds,
+        'fleet_size': args.fleet_size,
+        'results': run_benchmarks(args.scenarios, args.seconds, args.repeat, args.fleet_size),
+    }
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report['changes'], regressions = compare(report['results'], baseline['results'], args.threshold)
+        report['regressions'] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+from enum import IntEnum
+
+import pygame
+
+
+class Action(IntEnum):
+    """Player actions shared by the keyboard, the environment API and replays."""
+    NOOP = 0
+    RELOAD = 1
+    RETRAIN = 2
+    SHUTDOWN = 3  # toggles shutdown / restart
+    RAILGUARDS = 4
+    # Actions from TOOL_BASE on toggle the tools in TOOL_COSTS order
+
+TOOL_BASE = len(Action)
+
+KEY_ACTIONS = {
+    pygame.K_r: Action.RELOAD,
+    pygame.K_t: Action.RETRAIN,
+    pygame.K_s: Action.SHUTDOWN,
+    pygame.K_g: Action.RAILGUARDS,
+}
+
+
+def action_names(tool_names):
+    return tuple(a.name.lower() for a in Action) + tuple(f"tool:{name}" for name in tool_names)
+
+
+def action_for_key(key, num_tools):
+    # Number keys 1-5 toggle the tools in TOOL_COSTS order
+    if pygame.K_1 <= key < pygame.K_1 + num_tools:
+        return TOOL_BASE + key - pygame.K_1
+    return KEY_ACTIONS.get(key)
+
+
+def apply_action(engine, action):
+    """Apply `action` to `engine` and return whether it had an effect."""
+    action = int(action)
+    if action == Action.RELOAD:
+        return engine.reload()
+    elif action == Action.RETRAIN:
+        return engine.retrain()
+    elif action == Action.SHUTDOWN:
+        return engine.toggle_shutdown()
+    elif action == Action.RAILGUARDS:
+        return engine.purchase_railguards()
+    elif action >= TOOL_BASE:
+        return engine.toggle_tool(engine.tool_manager.tool_names[action - TOOL_BASE])
+    return True
@@ -1,95 +1,173 @@
-import random
 import numpy as np
 
+from game.patterns import BehaviorPatternBuffer, ANOMALOUS
+from game.state import AIState
+
 class AISystem:
-    def __init__(self, config):
+    def __init__(self, config, seed=None):
         self.config = config
+        self.rng = np.random.default_rng(seed)
         self.intelligence = config.AI_BASE_INTELLIGENCE
         self.risk_level = config.BASE_RISK_LEVEL
         self.alignment = config.INITIAL_ALIGNMENT
-        self.behavior_patterns = []
+        self.patterns = BehaviorPatternBuffer(config.BEHAVIOR_PATTERN_CAPACITY)
         self.anomalies_detected = 0
         self.last_update_time = 0
         self.alignment_decay_reduction = 1.0  # Default no reduction
+        self.state = AIState(behavior_patterns=self.patterns)
         
     def set_alignment_decay_reduction(self, reduction_factor):
         self.alignment_decay_reduction = 1.0 - reduction_factor
         
-    def update(self, current_time, tools_active):
+    def boost_alignment(self, amount):
+        self.alignment = min(1.0, self.alignment + amount)
+        
+    def update(self, current_time, active_tool_count):
+        time_delta = current_time - self.last_update_time
+        
         # Update AI intelligence
+        self.intelligence = self._intelligence_after(time_delta)
+        
+        # Update alignment based on risk level and active tools
+        self._update_alignment(time_delta, active_tool_count)
+        
+        # Calculate risk level based on intelligence, alignment, and active tools
+        self._update_risk(active_tool_count)
+        
+        # Generate behavior patterns
+        self._generate_behavior_patterns()
+        
+        # Update last update time
+        self.last_update_time = current_time
+        
+    def advance(self, current_time, active_tool_count):
+        """Jump the AI state forward to `current_time`, as if update() ran once per tick.
+        
+        Intelligence and alignment change at constant rates while the active tools and
+        railguards stay the same, so their clamped linear trajectories are exact for any
+        interval; callers split the interval wherever tools or railguards change. The
+        anomalies of every tick but the last are drawn per piece of the interval with the
+        same expected count as generating their patterns, and the last tick generates its
+        patterns as update() does. The cost does not depend on the length of the interval.
+        """
+        tick_duration = self.config.TICK_DURATION
         time_delta = current_time - self.last_update_time
-        self.intelligence = min(
+        self._sample_interval_anomalies(time_delta - tick_duration, active_tool_count)
+        
+        self.intelligence = self._intelligence_after(time_delta)
+        self._update_alignment(time_delta, active_tool_count)
+        self._update_risk(active_tool_count)
+        
+        # The last tick's batch is stamped with the time of the tick before, as in update()
+        self.last_update_time = current_time - tick_duration
+        self._generate_behavior_patterns()
+        self.last_update_time = current_time
+        
+    def trajectory(self, ticks, active_tool_count):
+        """Risk levels and alignments after each of the next `ticks` ticks, as arrays.
+        
+        Follows the same dynamics as advance() without changing the state, so callers can
+        apply per-tick effects and checks over the interval before jumping over it.
+        """
+        config = self.config
+        elapsed = np.arange(1, ticks + 1) * config.TICK_DURATION
+        intelligence = np.minimum(self.intelligence + config.AI_INTELLIGENCE_GROWTH_RATE * elapsed, config.MAX_AI_INTELLIGENCE)
+        alignment = np.clip(self.alignment + self.alignment_rate(active_tool_count) * elapsed, config.MIN_ALIGNMENT, 1.0)
+        
+        # Same risk formula as _update_risk, for every tick at once
+        risk = intelligence * (0.5 / config.MAX_AI_INTELLIGENCE)
+        risk += (1 - alignment) * 0.3
+        risk += config.BASE_RISK_LEVEL - active_tool_count * 0.1
+        return np.maximum(risk, 0.0), alignment
+        
+    def alignment_rate(self, active_tool_count):
+        # Net alignment change per second: recovery from active tools minus (railguard-reduced) decay
+        decay = self.config.ALIGNMENT_DECAY_RATE * self.alignment_decay_reduction
+        recovery = self.config.ALIGNMENT_RECOVERY_RATE * active_tool_count
+        return recovery - decay
+        
+    def _intelligence_after(self, time_delta):
+        return min(
             self.intelligence + self.config.AI_INTELLIGENCE_GROWTH_RATE * time_delta,
             self.config.MAX_AI_INTELLIGENCE
         )
         
-        # Update alignment based on risk level and active tools
-        self._update_alignment(time_delta, tools_active)
+    def _alignment_after(self, time_delta, rate):
+        return max(
+            self.config.MIN_ALIGNMENT,
+            min(1.0, self.alignment + rate * time_delta)
+        )
         
-        # Calculate risk level based on intelligence, alignment, and active tools
+    def _update_alignment(self, time_delta, active_tool_count):
+        self.alignment = self._alignment_after(time_delta, self.alignment_rate(active_tool_count))
+        
+    def _update_risk(self, active_tool_count):
         base_risk = self.config.BASE_RISK_LEVEL
         intelligence_factor = self.intelligence / self.config.MAX_AI_INTELLIGENCE
         alignment_factor = 1 - self.alignment  # Lower alignment increases risk
-        tool_mitigation = sum(tools_active.values()) * 0.1
+        tool_mitigation = active_tool_count * 0.1
         
         self.risk_level = max(
             base_risk + (intelligence_factor * 0.5) + (alignment_factor * 0.3) - tool_mitigation,
             0.0
         )
         
-        # Generate behavior patterns
-        self._generate_behavior_patterns()
-        
-        # Update last update time
-        self.last_update_time = current_time
-        
-    def _update_alignment(self, time_delta, tools_active):
-        # Base decay
-        decay = self.config.ALIGNMENT_DECAY_RATE * time_delta * self.alignment_decay_reduction
+    def _sample_interval_anomalies(self, time_delta, active_tool_count):
+        # Split the interval where the per-tick pattern count changes, where intelligence
+        # saturates and where alignment hits a clamp. Within each piece the pattern count is
+        # constant and alignment is linear, so the mean anomaly probability of its ticks is
+        # the one at the midpoint. There are at most ~PATTERNS_PER_INTELLIGENCE *
+        # MAX_AI_INTELLIGENCE + 2 pieces.
+        config = self.config
+        growth = config.AI_INTELLIGENCE_GROWTH_RATE
+        per_intelligence = config.PATTERNS_PER_INTELLIGENCE
+        rate = self.alignment_rate(active_tool_count)
+        breakpoints = {0.0, time_delta}
+        if growth > 0:
+            target = config.MAX_AI_INTELLIGENCE
+            count = int(self.intelligence * per_intelligence) + 1
+            while count / per_intelligence < target:
+                breakpoints.add((count / per_intelligence - self.intelligence) / growth)
+                count += 1
+            breakpoints.add((target - self.intelligence) / growth)
+        if rate < 0:
+            breakpoints.add((config.MIN_ALIGNMENT - self.alignment) / rate)
+        elif rate > 0:
+            breakpoints.add((1.0 - self.alignment) / rate)
+        times = sorted(t for t in breakpoints if 0.0 <= t <= time_delta)
         
-        # Recovery from active tools
-        recovery = 0
-        for tool in tools_active:
-            if tools_active[tool]:
-                recovery += self.config.ALIGNMENT_RECOVERY_RATE * time_delta
+        # Ticks fall on multiples of TICK_DURATION after the last update; count the ones in
+        # each piece from their absolute indices so no tick is lost or counted twice
+        tick_indices = [int(t / config.TICK_DURATION + 1e-9) for t in times]
+        for start, end, ticks in zip(times, times[1:], np.diff(tick_indices)):
+            mid = (start + end) / 2
+            pattern_count = int(self._intelligence_after(mid) * per_intelligence)
+            anomaly_prob = (1 - self._alignment_after(mid, rate)) * 0.5 * 0.3
+            if pattern_count and ticks and anomaly_prob > 0:
+                self.anomalies_detected += int(self.rng.binomial(pattern_count * int(ticks), anomaly_prob))
                 
-        # Update alignment
-        self.alignment = max(
-            self.config.MIN_ALIGNMENT,
-            min(1.0, self.alignment - decay + recovery)
-        )
-        
     def _generate_behavior_patterns(self):
         # Generate random behavior patterns that become more complex as intelligence increases
-        pattern_count = int(self.intelligence * 2)
-        self.behavior_patterns = []
-        
-        for _ in range(pattern_count):
-            # Alignment affects the probability of anomalous behavior
-            anomaly_prob = (1 - self.alignment) * 0.5
-            pattern_type = random.choices(
-                ['normal', 'suspicious', 'anomalous'],
-                weights=[1 - anomaly_prob, anomaly_prob * 0.7, anomaly_prob * 0.3]
-            )[0]
-            
-            pattern = {
-                'type': pattern_type,
-                'complexity': random.random() * self.intelligence,
-                'timestamp': self.last_update_time
-            }
-            self.behavior_patterns.append(pattern)
-            
-            if pattern['type'] == 'anomalous':
-                self.anomalies_detected += 1
+        pattern_count = int(self.intelligence * self.config.PATTERNS_PER_INTELLIGENCE)
+        
+        # Alignment affects the probability of anomalous behavior
+        anomaly_prob = (1 - self.alignment) * 0.5
+        normal_weight = 1 - anomaly_prob
+        suspicious_weight = anomaly_prob * 0.7
+        
+        # One draw for the whole batch: first row picks the pattern types, second row the complexities
+        samples = self.rng.random((2, pattern_count))
+        type_codes = (samples[0] >= normal_weight).astype(np.int8) + (samples[0] >= normal_weight + suspicious_weight)
+        self.patterns.append_batch(type_codes, samples[1] * self.intelligence, self.last_update_time)
+        self.anomalies_detected += int(np.count_nonzero(type_codes == ANOMALOUS))
                 
+    @property
+    def behavior_patterns(self):
+        return self.patterns.latest()
+        
     def get_state(self):
-        return {
-            'intelligence': self.intelligence,
-            'risk_level': self.risk_level,
-            'alignment': self.alignment,
-            'behavior_patterns': self.behavior_patterns,
-            'anomalies_detected': self.anomalies_detected
-        }
+        self.state.set(self.intelligence, self.risk_level, self.alignment, self.anomalies_detected)
+        return self.state
         
     def apply_tool_effect(self, tool_name, effectiveness):
         # Apply the effect of a monitoring tool
@@ -0,0 +1,11 @@
+class ManualClock:
+    """Clock that only moves when advanced, for driving GameEngine headlessly."""
+
+    def __init__(self, start_time=0.0):
+        self.time = start_time
+
+    def __call__(self):
+        return self.time
+
+    def advance(self, seconds):
+        self.time += seconds
@@ -4,6 +4,13 @@ class GameConfig:
         self.SCREEN_WIDTH = 1280
         self.SCREEN_HEIGHT = 720
         self.FPS = 60
+        self.IDLE_FPS = 10  # redraw rate while nothing on screen changes
+        self.IDLE_TIMEOUT = 1.0  # seconds to wait for input while paused or after game over
+        
+        # Simulation settings
+        self.TICK_RATE = 60  # fixed simulation ticks per second
+        self.TICK_DURATION = 1.0 / self.TICK_RATE
+        self.MAX_FRAME_TIME = 0.25  # seconds of real time simulated per frame at most
         
         # Colors
         self.BACKGROUND_COLOR = (20, 20, 20)
@@ -44,8 +51,16 @@ class GameConfig:
         self.AI_BASE_INTELLIGENCE = 1.0
         self.AI_INTELLIGENCE_GROWTH_RATE = 0.01
         self.MAX_AI_INTELLIGENCE = 10.0
+        self.PATTERNS_PER_INTELLIGENCE = 2  # behavior patterns generated per update per intelligence point
+        self.BEHAVIOR_PATTERN_CAPACITY = 4096  # most recent patterns kept in the ring buffer
+        
+        # Fleet settings (FLEET_SIZE > 1 oversees many AI systems at once)
+        self.FLEET_SIZE = 1
+        self.FLEET_GROWTH_SPREAD = 0.5  # each model's growth rate is AI_INTELLIGENCE_GROWTH_RATE * U(1 - spread, 1 + spread)
+        self.FLEET_DECAY_SPREAD = 0.5  # each model's alignment decay rate is ALIGNMENT_DECAY_RATE * U(1 - spread, 1 + spread)
+        self.FLEET_MAX_ROGUE_FRACTION = 0.1  # the game is lost once more models than this went rogue
         
-        # Tool settings
+        # Tool settings (the keys of TOOL_COSTS define the tools and their order)
         self.TOOL_COSTS = {
             'basic_monitor': 500,
             'advanced_monitor': 2000,
@@ -62,6 +77,14 @@ class GameConfig:
             'emergency_protocol': 1000
         }
         
+        self.TOOL_EFFECTIVENESS = {
+            'basic_monitor': 0.2,
+            'advanced_monitor': 0.4,
+            'automated_analysis': 0.6,
+            'predictive_system': 0.8,
+            'emergency_protocol': 1.0
+        }
+        
         # Railguards feature
         self.RAILGUARDS_COST = 1000  # Money cost
         self.RAILGUARDS_RESEARCH_COST = 50  # Research points cost
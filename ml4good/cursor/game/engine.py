@@ -1,12 +1,22 @@
 import time
-import pygame
+
+import numpy as np
+
+from game.actions import action_for_key, apply_action
 from game.ai_system import AISystem
+from game.fleet import AIFleet
 from game.tools import ToolManager
+from game.state import GameState, EmergencyStatus
 
 class GameEngine:
-    def __init__(self, config):
+    def __init__(self, config, clock=time.time, seed=None):
         self.config = config
-        self.ai_system = AISystem(config)
+        # Any zero-argument callable returning seconds, e.g. a ManualClock for headless runs
+        self.clock = clock
+        if config.FLEET_SIZE > 1:
+            self.ai_system = AIFleet(config, config.FLEET_SIZE, seed)
+        else:
+            self.ai_system = AISystem(config, seed)
         self.tool_manager = ToolManager(config)
         
         # Game state
@@ -15,7 +25,10 @@ class GameEngine:
         self.reports = config.INITIAL_REPORTS
         self.game_time = 0
         self.game_over = False
-        self.last_update_time = time.time()
+        self.paused = False
+        self.last_update_time = self.clock()
+        self.tick_accumulator = 0.0
+        self.tick_count = 0
         
         # Emergency action state
         self.is_shutdown = False
@@ -27,15 +40,94 @@ class GameEngine:
         
         self.railguards_active = False
         
+        # Records returned by get_game_state(), updated in place
+        self.state = GameState(
+            ai_state=self.ai_system.state,
+            emergency_status=EmergencyStatus(),
+            tools_status=self.tool_manager.get_all_tools_status()
+        )
+        
     def update(self):
-        current_time = time.time()
-        time_delta = current_time - self.last_update_time
+        """Advance the simulation by the clock time elapsed since the last call, in fixed ticks."""
+        current_time = self.clock()
+        # Clamp long hitches so a stalled frame can't trigger a burst of catch-up ticks
+        frame_time = min(current_time - self.last_update_time, self.config.MAX_FRAME_TIME)
+        self.last_update_time = current_time
         
+        # The simulation stands still while paused and once the game is over
+        if self.paused or self.game_over:
+            return
+        
+        self.tick_accumulator += frame_time
+        while self.tick_accumulator >= self.config.TICK_DURATION:
+            self.step(self.config.TICK_DURATION)
+            self.tick_accumulator -= self.config.TICK_DURATION
+            
+    def run_for(self, seconds):
+        """Advance the simulation by `seconds` of game time without reading the clock.
+        
+        Matches stepping tick by tick, up to rounding and the random draws. Without input
+        only emergency actions change the dynamics, so once none is running and the AI is
+        up to date, the remaining ticks are jumped over at once (see _fast_forward). A
+        fleet is still stepped tick by tick, and so are replays, which apply their inputs
+        between ticks.
+        """
+        ticks = int(round(seconds / self.config.TICK_DURATION))
+        while ticks > 0:
+            if (self.config.FLEET_SIZE > 1 or self.is_reloading or self.is_retraining or
+                    self.ai_system.last_update_time != self.game_time):
+                self.step(self.config.TICK_DURATION)
+                ticks -= 1
+            else:
+                self._fast_forward(ticks)
+                ticks = 0
+                
+    def _fast_forward(self, ticks):
+        # Same effect as `ticks` calls of step() while no emergency action runs and no
+        # input arrives: the AI jumps with AISystem.advance, and the reports and money of
+        # every tick are computed in one vectorized pass over its risk and alignment
+        config = self.config
+        time_delta = config.TICK_DURATION
+        ai = self.ai_system
+        active_tool_count = self.tool_manager.active_count
+        risk_levels, alignments = ai.trajectory(ticks, active_tool_count)
+        
+        self.game_time += ticks * time_delta
+        self.tick_count += ticks
+        if not self.is_shutdown:
+            income = config.MONEY_PER_SECOND * time_delta * self.user_base
+            self.research_points += config.RESEARCH_POINTS_PER_SECOND * time_delta * ticks
+        else:
+            income = config.MONEY_PER_SECOND * time_delta * config.SHUTDOWN_MONEY_MULTIPLIER
+            
+        # Each tick's reports come from the risk and alignment left by the tick before,
+        # with the same formula as _update_reports
+        risk_before = np.concatenate(([ai.risk_level], risk_levels[:-1]))
+        alignment_before = np.concatenate(([ai.alignment], alignments[:-1]))
+        new_reports = np.minimum(
+            config.BASE_REPORT_RATE * (1 + risk_before * 10) * (1 + (1 - alignment_before) * 5),
+            config.MAX_REPORT_RATE
+        ) * time_delta
+        self.reports += float(new_reports.sum())
+        
+        # money = max(0, money + income - loss) every tick; with S the running sum of
+        # income - loss, the money after the last tick is max(money + S[-1], max(S[-1] - S))
+        balance = np.cumsum(income - new_reports * config.MONEY_LOSS_PER_REPORT)
+        self.money = max(self.money + float(balance[-1]), float((balance[-1] - balance).max()))
+        
+        ai.advance(self.game_time, active_tool_count)
+        
+        # Same check as AISystem.is_going_rogue after every tick; the anomaly count only grows
+        if ai.is_going_rogue() or (risk_levels > 0.8).any() or (alignments < 0.2).any():
+            self.game_over = True
+        
+    def step(self, time_delta):
         # Update game time
         self.game_time += time_delta
+        self.tick_count += 1
         
         # Handle emergency actions
-        self._handle_emergency_actions(current_time)
+        self._handle_emergency_actions()
         
         # Update resources based on current state
         if not self.is_shutdown:
@@ -48,33 +140,22 @@ class GameEngine:
         if not (self.is_reloading or self.is_retraining):
             self._update_reports(time_delta)
         
-        # Get active tools
-        active_tools = self.tool_manager.get_active_tools()
-        
         # Update AI system
         if not (self.is_reloading or self.is_retraining):
-            self.ai_system.update(self.game_time, active_tools)
+            self.ai_system.update(self.game_time, self.tool_manager.active_count)
         
         # Check for game over condition
         if self.ai_system.is_going_rogue():
             self.game_over = True
-            
-        self.last_update_time = current_time
         
-    def _handle_emergency_actions(self, current_time):
+    def _handle_emergency_actions(self):
         if self.is_reloading or self.is_retraining:
-            if current_time - self.action_start_time >= self.action_duration:
+            if self.game_time - self.action_start_time >= self.action_duration:
                 # Action completed
                 if self.is_reloading:
-                    self.ai_system.alignment = min(
-                        1.0,
-                        self.ai_system.alignment + self.config.RELOAD_ALIGNMENT_BOOST
-                    )
+                    self.ai_system.boost_alignment(self.config.RELOAD_ALIGNMENT_BOOST)
                 elif self.is_retraining:
-                    self.ai_system.alignment = min(
-                        1.0,
-                        self.ai_system.alignment + self.config.RETRAIN_ALIGNMENT_BOOST
-                    )
+                    self.ai_system.boost_alignment(self.config.RETRAIN_ALIGNMENT_BOOST)
                 self.is_reloading = False
                 self.is_retraining = False
         
@@ -83,28 +164,49 @@ class GameEngine:
         # Handle both pygame events and direct key codes
         key = event.key if hasattr(event, 'key') else event
         
-        if key == pygame.K_1:
-            self.tool_manager.toggle_tool('behavior_monitor')
-        elif key == pygame.K_2:
-            self.tool_manager.toggle_tool('risk_assessor')
-        elif key == pygame.K_3:
-            self.tool_manager.toggle_tool('alignment_tracker')
-        elif key == pygame.K_4:
-            self.tool_manager.toggle_tool('emergency_protocol')
-        elif key == pygame.K_r:
-            if not self.is_reloading and not self.is_retraining:
-                self.is_reloading = True
-                self.action_start_time = time.time()
-                self.action_duration = self.config.RELOAD_DOWNTIME
-        elif key == pygame.K_t:
-            if not self.is_reloading and not self.is_retraining:
-                self.is_retraining = True
-                self.action_start_time = time.time()
-                self.action_duration = self.config.RETRAIN_DOWNTIME
-        elif key == pygame.K_s:
-            self.is_shutdown = not self.is_shutdown
-            if self.is_shutdown:
-                self.user_base *= (1 - self.config.SHUTDOWN_USER_LOSS)
+        action = action_for_key(key, len(self.tool_manager.tool_names))
+        if action is not None:
+            apply_action(self, action)
+            
+    def reload(self):
+        if not self.is_reloading and not self.is_retraining:
+            self.is_reloading = True
+            self.action_start_time = self.game_time
+            self.action_duration = self.config.RELOAD_DOWNTIME
+            return True
+        return False
+        
+    def retrain(self):
+        if not self.is_reloading and not self.is_retraining:
+            self.is_retraining = True
+            self.action_start_time = self.game_time
+            self.action_duration = self.config.RETRAIN_DOWNTIME
+            return True
+        return False
+        
+    def toggle_shutdown(self):
+        self.is_shutdown = not self.is_shutdown
+        if self.is_shutdown:
+            self.user_base *= (1 - self.config.SHUTDOWN_USER_LOSS)
+        return True
+        
+    def toggle_tool(self, tool_name):
+        """Buy and activate the tool if it is inactive and affordable, or deactivate it."""
+        tool_status = self.tool_manager.get_tool_status(tool_name)
+        if tool_status:
+            if not tool_status.active:
+                # Try to purchase and activate the tool
+                if self.tool_manager.purchase_tool(
+                    tool_name, 
+                    self.money, 
+                    self.research_points
+                ):
+                    self.money -= tool_status.cost
+                    return self.tool_manager.activate_tool(tool_name)
+            else:
+                # Deactivate the tool
+                return self.tool_manager.deactivate_tool(tool_name)
+        return False
         
     def _update_reports(self, time_delta):
         # Calculate report rate based on risk level and alignment
@@ -127,22 +229,6 @@ class GameEngine:
         money_loss = new_reports * self.config.MONEY_LOSS_PER_REPORT
         self.money = max(0, self.money - money_loss)
         
-    def _handle_tool_action(self, tool_name):
-        tool_status = self.tool_manager.get_tool_status(tool_name)
-        if tool_status:
-            if not tool_status['active']:
-                # Try to purchase and activate the tool
-                if self.tool_manager.purchase_tool(
-                    tool_name, 
-                    self.money, 
-                    self.research_points
-                ):
-                    self.money -= tool_status['cost']
-                    self.tool_manager.activate_tool(tool_name)
-            else:
-                # Deactivate the tool
-                self.tool_manager.deactivate_tool(tool_name)
-                
     def purchase_railguards(self):
         if (not self.railguards_active and 
             self.money >= self.config.RAILGUARDS_COST and 
@@ -157,20 +243,36 @@ class GameEngine:
         return False
         
     def get_game_state(self):
-        return {
-            'money': self.money,
-            'research_points': self.research_points,
-            'reports': self.reports,
-            'game_time': self.game_time,
-            'game_over': self.game_over,
-            'ai_state': self.ai_system.get_state(),
-            'tools_status': self.tool_manager.get_all_tools_status(),
-            'emergency_status': {
-                'is_shutdown': self.is_shutdown,
-                'is_reloading': self.is_reloading,
-                'is_retraining': self.is_retraining,
-                'action_progress': min(1.0, (time.time() - self.action_start_time) / self.action_duration) if (self.is_reloading or self.is_retraining) else 0.0,
-                'user_base': self.user_base
-            },
-            'railguards_active': self.railguards_active
-        } 
\ No newline at end of file
+        """Refresh the game state records in place and return them.
+        
+        `state.version` only changes when some part of the state did, and the per-section
+        versions tell which part.
+        """
+        state = self.state
+        ai_version = state.ai_state.version
+        self.ai_system.get_state()
+        changed = state.ai_state.version != ai_version
+        
+        changed |= state.emergency_status.set(
+            self.is_shutdown,
+            self.is_reloading,
+            self.is_retraining,
+            min(1.0, (self.game_time - self.action_start_time) / self.action_duration) if (self.is_reloading or self.is_retraining) else 0.0,
+            self.user_base
+        )
+        changed |= state.set_resources(
+            self.money,
+            self.research_points,
+            self.reports,
+            self.game_time,
+            self.game_over,
+            self.railguards_active,
+            self.paused
+        )
+        if state.tools_version != self.tool_manager.version:
+            state.tools_version = self.tool_manager.version
+            changed = True
+            
+        if changed:
+            state.version += 1
+        return state
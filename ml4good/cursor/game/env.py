@@ -0,0 +1,186 @@
+import multiprocessing as mp
+
+import numpy as np
+
+from game.actions import action_names, apply_action
+from game.clock import ManualClock
+from game.config import GameConfig
+from game.engine import GameEngine
+
+
+class OverseerEnv:
+    """Gymnasium-style environment around a headless GameEngine.
+
+    Each `step` applies one action and then advances the game by `dt` seconds of game time.
+    Observations are float32 vectors built from `get_game_state()` (see
+    `observation_names`), and the reward is the game time survived during the step, so
+    an episode's return is the time until the AI went rogue (or `max_time`).
+    """
+
+    def __init__(self, config=None, dt=1.0, max_time=600.0, seed=None):
+        self.config = config or GameConfig()
+        self.dt = dt
+        self.max_time = max_time
+        self.tool_names = tuple(self.config.TOOL_COSTS)
+        self.action_names = action_names(self.tool_names)
+        self.n_actions = len(self.action_names)
+        self.observation_names = (
+            'money', 'research_points', 'reports', 'intelligence', 'risk_level', 'alignment',
+            'anomalies_detected', 'user_base', 'is_shutdown', 'is_reloading', 'is_retraining',
+            'action_progress', 'railguards_active'
+        ) + tuple(f"tool:{name}" for name in self.tool_names)
+        self._seed = seed
+        self._episode_seeds = None
+        self.engine = None
+
+    def reset(self, seed=None):
+        # A seeded reset reproduces GameEngine(seed=seed); later resets draw their seeds from it
+        seed = seed if seed is not None else self._seed
+        self._seed = None
+        if seed is not None:
+            self._episode_seeds = np.random.default_rng(seed)
+        elif self._episode_seeds is not None:
+            seed = int(self._episode_seeds.integers(2**31))
+        self.engine = GameEngine(self.config, clock=ManualClock(), seed=seed)
+        return self._observation(), {'seed': seed}
+
+    def step(self, action):
+        engine = self.engine
+        applied = apply_action(engine, action)
+
+        start_time = engine.game_time
+        for _ in range(int(round(self.dt / self.config.TICK_DURATION))):
+            engine.step(self.config.TICK_DURATION)
+            if engine.game_over:
+                break
+        observation = self._observation()
+        reward = engine.game_time - start_time
+        terminated = engine.game_over
+        truncated = not terminated and engine.game_time >= self.max_time
+        return observation, reward, terminated, truncated, {'action_applied': applied, 'game_time': engine.game_time}
+
+    def _observation(self):
+        state = self.engine.get_game_state()
+        ai_state = state.ai_state
+        emergency = state.emergency_status
+        return np.array(
+            (
+                state.money, state.research_points, state.reports, ai_state.intelligence,
+                ai_state.risk_level, ai_state.alignment, ai_state.anomalies_detected,
+                emergency.user_base, emergency.is_shutdown, emergency.is_reloading,
+                emergency.is_retraining, emergency.action_progress, state.railguards_active
+            ) + tuple(state.tools_status[name].active for name in self.tool_names),
+            dtype=np.float32
+        )
+
+    def close(self):
+        self.engine = None
+
+
+class SyncVectorEnv:
+    """Steps several environments one after the other in the calling process.
+
+    Finished environments are reset automatically; their last observation is returned in
+    `infos[i]['final_observation']` and the returned observation is the new episode's first.
+    """
+
+    def __init__(self, env_fns):
+        self.envs = [fn() for fn in env_fns]
+        self.num_envs = len(self.envs)
+
+    def reset(self, seeds=None):
+        seeds = seeds if seeds is not None else [None] * self.num_envs
+        observations, infos = zip(*(env.reset(seed) for env, seed in zip(self.envs, seeds)))
+        return np.stack(observations), list(infos)
+
+    def step(self, actions):
+        observations, rewards, terminated, truncated, infos = [], [], [], [], []
+        for env, action in zip(self.envs, actions):
+            observation, reward, term, trunc, info = env.step(action)
+            if term or trunc:
+                info['final_observation'] = observation
+                observation, _ = env.reset()
+            observations.append(observation)
+            rewards.append(reward)
+            terminated.append(term)
+            truncated.append(trunc)
+            infos.append(info)
+        return (
+            np.stack(observations),
+            np.array(rewards, dtype=np.float32),
+            np.array(terminated),
+            np.array(truncated),
+            infos
+        )
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+
+def _worker(remote, env_fns):
+    # Each worker steps a chunk of the environments, so one message covers many steps
+    envs = SyncVectorEnv(env_fns)
+    try:
+        while True:
+            command, data = remote.recv()
+            if command == 'step':
+                remote.send(envs.step(data))
+            elif command == 'reset':
+                remote.send(envs.reset(data))
+            elif command == 'close':
+                envs.close()
+                break
+    finally:
+        remote.close()
+
+
+class SubprocVectorEnv:
+    """Steps environments in a pool of worker processes, each owning a chunk of them.
+
+    `env_fns` must be picklable (e.g. `functools.partial(OverseerEnv, dt=1.0)`).
+    Same interface and autoreset behavior as SyncVectorEnv.
+    """
+
+    def __init__(self, env_fns, num_workers=None, context=None):
+        self.num_envs = len(env_fns)
+        num_workers = min(num_workers or mp.cpu_count(), self.num_envs)
+        ctx = mp.get_context(context)
+        self._chunks = np.array_split(np.arange(self.num_envs), num_workers)
+        self._remotes, self._processes = [], []
+        for chunk in self._chunks:
+            remote, worker_remote = ctx.Pipe()
+            process = ctx.Process(target=_worker, args=(worker_remote, [env_fns[i] for i in chunk]), daemon=True)
+            process.start()
+            worker_remote.close()
+            self._remotes.append(remote)
+            self._processes.append(process)
+        self.closed = False
+
+    def reset(self, seeds=None):
+        for remote, chunk in zip(self._remotes, self._chunks):
+            remote.send(('reset', None if seeds is None else [seeds[i] for i in chunk]))
+        results = [remote.recv() for remote in self._remotes]
+        return np.concatenate([r[0] for r in results]), [info for r in results for info in r[1]]
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        for remote, chunk in zip(self._remotes, self._chunks):
+            remote.send(('step', actions[chunk]))
+        results = [remote.recv() for remote in self._remotes]
+        return (
+            np.concatenate([r[0] for r in results]),
+            np.concatenate([r[1] for r in results]),
+            np.concatenate([r[2] for r in results]),
+            np.concatenate([r[3] for r in results]),
+            [info for r in results for info in r[4]]
+        )
+
+    def close(self):
+        if self.closed:
+            return
+        for remote in self._remotes:
+            remote.send(('close', None))
+        for process in self._processes:
+            process.join()
+        self.closed = True
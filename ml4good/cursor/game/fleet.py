@@ -0,0 +1,95 @@
+import numpy as np
+
+from game.state import AIState
+
+
+class AIFleet:
+    """Many independently evolving AI systems, stored as columnar NumPy arrays.
+
+    Drop-in replacement for AISystem in GameEngine when `config.FLEET_SIZE > 1`. Every
+    model follows the AISystem dynamics with its own intelligence growth rate and
+    alignment decay rate, and the whole fleet is updated in one vectorized pass per tick. Behavior patterns are not
+    stored; each model's anomalous patterns are drawn from a binomial with the same
+    distribution. Tools and railguards act on the whole fleet. The scalar attributes
+    the engine and UI read (intelligence, alignment, risk level, anomalies) are fleet
+    aggregates, and the game is lost once more than FLEET_MAX_ROGUE_FRACTION of the
+    models went rogue. A model that went rogue stays rogue, even if a later alignment
+    boost brings it back below the thresholds.
+    """
+
+    def __init__(self, config, size, seed=None):
+        self.config = config
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        spread = config.FLEET_GROWTH_SPREAD
+        self.growth_rates = config.AI_INTELLIGENCE_GROWTH_RATE * self.rng.uniform(1 - spread, 1 + spread, size)
+        spread = config.FLEET_DECAY_SPREAD
+        self.decay_rates = config.ALIGNMENT_DECAY_RATE * self.rng.uniform(1 - spread, 1 + spread, size)
+        self.intelligences = np.full(size, float(config.AI_BASE_INTELLIGENCE))
+        self.alignments = np.full(size, float(config.INITIAL_ALIGNMENT))
+        self.risk_levels = np.full(size, float(config.BASE_RISK_LEVEL))
+        self.anomaly_counts = np.zeros(size, dtype=np.int64)
+        self.rogue = np.zeros(size, dtype=bool)
+        self.rogue_count = 0
+        self.last_update_time = 0
+        self.alignment_decay_reduction = 1.0  # Default no reduction
+        self.state = AIState()
+
+    @property
+    def intelligence(self):
+        return float(self.intelligences.mean())
+
+    @property
+    def alignment(self):
+        return float(self.alignments.mean())
+
+    @property
+    def risk_level(self):
+        return float(self.risk_levels.mean())
+
+    @property
+    def anomalies_detected(self):
+        return int(self.anomaly_counts.sum())
+
+    def set_alignment_decay_reduction(self, reduction_factor):
+        self.alignment_decay_reduction = 1.0 - reduction_factor
+
+    def boost_alignment(self, amount):
+        np.minimum(self.alignments + amount, 1.0, out=self.alignments)
+
+    def alignment_rate(self, active_tool_count):
+        # Per-model net alignment change per second, as in AISystem.alignment_rate
+        decay = self.decay_rates * self.alignment_decay_reduction
+        recovery = self.config.ALIGNMENT_RECOVERY_RATE * active_tool_count
+        return recovery - decay
+
+    def update(self, current_time, active_tool_count):
+        config = self.config
+        time_delta = current_time - self.last_update_time
+
+        np.minimum(self.intelligences + self.growth_rates * time_delta, config.MAX_AI_INTELLIGENCE, out=self.intelligences)
+        np.clip(self.alignments + self.alignment_rate(active_tool_count) * time_delta, config.MIN_ALIGNMENT, 1.0, out=self.alignments)
+
+        # Same risk formula as AISystem._update_risk, for every model at once
+        risk = self.intelligences * (0.5 / config.MAX_AI_INTELLIGENCE)
+        risk += (1 - self.alignments) * 0.3
+        risk += config.BASE_RISK_LEVEL - active_tool_count * 0.1
+        np.maximum(risk, 0.0, out=self.risk_levels)
+
+        # A pattern is anomalous with probability 0.3 * (1 - alignment) * 0.5
+        pattern_counts = (self.intelligences * config.PATTERNS_PER_INTELLIGENCE).astype(np.int64)
+        self.anomaly_counts += self.rng.binomial(pattern_counts, (1 - self.alignments) * 0.15)
+
+        # Same condition as AISystem.is_going_rogue, per model; going rogue is permanent
+        self.rogue |= (self.risk_levels > 0.8) | (self.anomaly_counts > 10) | (self.alignments < 0.2)
+        self.rogue_count = int(np.count_nonzero(self.rogue))
+
+        self.last_update_time = current_time
+
+    def get_state(self):
+        self.state.set(self.intelligence, self.risk_level, self.alignment, self.anomalies_detected)
+        self.state.set_fleet(self.size, self.rogue_count, float(self.alignments.min()))
+        return self.state
+
+    def is_going_rogue(self):
+        return self.rogue_count > self.config.FLEET_MAX_ROGUE_FRACTION * self.size
@@ -0,0 +1,55 @@
+import numpy as np
+
+PATTERN_TYPES = ('normal', 'suspicious', 'anomalous')
+NORMAL, SUSPICIOUS, ANOMALOUS = range(len(PATTERN_TYPES))
+
+
+class BehaviorPatternBuffer:
+    """Fixed-capacity ring buffer of behavior patterns, stored as parallel NumPy arrays.
+
+    Patterns are appended a batch at a time (one batch per AI update) and the oldest
+    entries are overwritten once the buffer is full, so nothing is allocated per frame.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.type_codes = np.zeros(capacity, dtype=np.int8)
+        self.complexity = np.zeros(capacity, dtype=np.float32)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.head = 0  # next write position
+        self.size = 0
+        self.last_batch_size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append_batch(self, type_codes, complexity, timestamp):
+        count = len(type_codes)
+        if count > self.capacity:
+            type_codes, complexity = type_codes[-self.capacity:], complexity[-self.capacity:]
+            count = self.capacity
+        idx = (self.head + np.arange(count)) % self.capacity
+        self.type_codes[idx] = type_codes
+        self.complexity[idx] = complexity
+        self.timestamps[idx] = timestamp
+        self.head = (self.head + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        self.last_batch_size = count
+
+    def latest_indices(self, count=None):
+        count = self.last_batch_size if count is None else min(count, self.size)
+        return (self.head - count + np.arange(count)) % self.capacity
+
+    def latest(self, count=None):
+        """Patterns of the latest batch (or the `count` most recent ones) as a list of dicts."""
+        return [
+            {
+                'type': PATTERN_TYPES[self.type_codes[i]],
+                'complexity': float(self.complexity[i]),
+                'timestamp': float(self.timestamps[i])
+            }
+            for i in self.latest_indices(count)
+        ]
+
+    def type_counts(self, count=None):
+        return np.bincount(self.type_codes[self.latest_indices(count)], minlength=len(PATTERN_TYPES))
@@ -0,0 +1,141 @@
+import struct
+import time
+
+import numpy as np
+
+from game.ai_system import AISystem
+from game.engine import GameEngine
+
+# Saved state layout (little-endian):
+#   STATE_RECORD   magic and format version, then the fixed-size fields of GameEngine,
+#                  AISystem, ToolManager, the behavior pattern buffer and the PCG64 state
+#   arrays         the first `size` entries of the pattern buffer's type codes (int8),
+#                  complexities (float32) and timestamps (float64)
+# The config is not saved; loading needs the same tools and pattern capacity.
+MAGIC = b'AIOS'
+FORMAT_VERSION = 1
+STATE_RECORD = struct.Struct(
+    '<4sH'
+    # GameEngine: money, research_points, reports, game_time, tick_accumulator, tick_count,
+    # action_start_time, action_duration, user_base, is_shutdown, is_reloading,
+    # is_retraining, railguards_active, game_over, paused
+    'dddddQddd??????'
+    # AISystem: intelligence, risk_level, alignment, anomalies_detected, last_update_time,
+    # alignment_decay_reduction
+    'dddqdd'
+    # ToolManager: number of tools, active_mask
+    'IQ'
+    # BehaviorPatternBuffer: capacity, head, size, last_batch_size
+    'IIII'
+    # PCG64: state, inc, has_uint32, uinteger
+    '16s16sII'
+)
+
+
+def save_engine(engine):
+    """Serialize the full simulation state of `engine` (everything but config and clock)."""
+    ai = engine.ai_system
+    if not isinstance(ai, AISystem):
+        raise ValueError("only single-AI games can be saved")
+    patterns = ai.patterns
+    rng_state = ai.rng.bit_generator.state
+    if rng_state['bit_generator'] != 'PCG64':
+        raise ValueError(f"cannot save a {rng_state['bit_generator']} generator")
+    size = patterns.size
+    return b''.join((
+        STATE_RECORD.pack(
+            MAGIC, FORMAT_VERSION,
+            engine.money, engine.research_points, engine.reports, engine.game_time,
+            engine.tick_accumulator, engine.tick_count, engine.action_start_time,
+            engine.action_duration, engine.user_base, engine.is_shutdown, engine.is_reloading,
+            engine.is_retraining, engine.railguards_active, engine.game_over, engine.paused,
+            ai.intelligence, ai.risk_level, ai.alignment, ai.anomalies_detected,
+            ai.last_update_time, ai.alignment_decay_reduction,
+            len(engine.tool_manager.tool_names), engine.tool_manager.active_mask,
+            patterns.capacity, patterns.head, size, patterns.last_batch_size,
+            rng_state['state']['state'].to_bytes(16, 'little'),
+            rng_state['state']['inc'].to_bytes(16, 'little'),
+            rng_state['has_uint32'], rng_state['uinteger']
+        ),
+        # Until the buffer wraps around, its entries are the first `size` slots
+        patterns.type_codes[:size].tobytes(),
+        patterns.complexity[:size].tobytes(),
+        patterns.timestamps[:size].tobytes(),
+    ))
+
+
+def load_engine(data, config, clock=time.time):
+    """Rebuild a GameEngine from `save_engine` output, for the same config."""
+    fields = STATE_RECORD.unpack_from(data)
+    magic, version = fields[:2]
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"not a version {FORMAT_VERSION} game state")
+    (
+        money, research_points, reports, game_time, tick_accumulator, tick_count,
+        action_start_time, action_duration, user_base, is_shutdown, is_reloading,
+        is_retraining, railguards_active, game_over, paused,
+        intelligence, risk_level, alignment, anomalies_detected, ai_last_update_time,
+        alignment_decay_reduction,
+        num_tools, active_mask,
+        capacity, head, size, last_batch_size,
+        rng_state, rng_inc, has_uint32, uinteger
+    ) = fields[2:]
+
+    engine = GameEngine(config, clock=clock)
+    tool_manager = engine.tool_manager
+    patterns = engine.ai_system.patterns
+    if num_tools != len(tool_manager.tool_names) or capacity != patterns.capacity:
+        raise ValueError("game state was saved with different tools or pattern capacity")
+
+    engine.money = money
+    engine.research_points = research_points
+    engine.reports = reports
+    engine.game_time = game_time
+    engine.tick_accumulator = tick_accumulator
+    engine.tick_count = tick_count
+    engine.action_start_time = action_start_time
+    engine.action_duration = action_duration
+    engine.user_base = user_base
+    engine.is_shutdown = is_shutdown
+    engine.is_reloading = is_reloading
+    engine.is_retraining = is_retraining
+    engine.railguards_active = railguards_active
+    engine.game_over = game_over
+    engine.paused = paused
+
+    ai = engine.ai_system
+    ai.intelligence = intelligence
+    ai.risk_level = risk_level
+    ai.alignment = alignment
+    ai.anomalies_detected = anomalies_detected
+    ai.last_update_time = ai_last_update_time
+    ai.alignment_decay_reduction = alignment_decay_reduction
+    ai.rng.bit_generator.state = {
+        'bit_generator': 'PCG64',
+        'state': {'state': int.from_bytes(rng_state, 'little'), 'inc': int.from_bytes(rng_inc, 'little')},
+        'has_uint32': has_uint32,
+        'uinteger': uinteger,
+    }
+
+    for i, name in enumerate(tool_manager.tool_names):
+        if active_mask & (1 << i):
+            tool_manager.activate_tool(name)
+
+    offset = STATE_RECORD.size
+    for array in (patterns.type_codes, patterns.complexity, patterns.timestamps):
+        array[:size] = np.frombuffer(data, dtype=array.dtype, count=size, offset=offset)
+        offset += size * array.itemsize
+    patterns.head = head
+    patterns.size = size
+    patterns.last_batch_size = last_batch_size
+    return engine
+
+
+def save(engine, path):
+    with open(path, 'wb') as f:
+        f.write(save_engine(engine))
+
+
+def load(path, config, clock=time.time):
+    with open(path, 'rb') as f:
+        return load_engine(f.read(), config, clock)
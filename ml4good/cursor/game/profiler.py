@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+
+FRAME_SECTIONS = ('events', 'update', 'state', 'render', 'wait')
+
+
+class FrameProfiler:
+    """Per-frame section timers kept in a fixed-size ring buffer.
+
+    Call `begin_frame()` at the top of the frame and `mark(section)` after each section;
+    a mark records the time since the previous one. Recording is one clock read and
+    one array write, so it can stay on in normal play.
+    """
+
+    def __init__(self, sections=FRAME_SECTIONS, capacity=3600, timer=time.perf_counter):
+        self.sections = tuple(sections)
+        self.capacity = capacity
+        self.timer = timer
+        self._columns = {name: i for i, name in enumerate(self.sections)}
+        self.times = np.zeros((capacity, len(self.sections)))  # seconds
+        self.frames = np.zeros(capacity, dtype=np.int64)
+        self.frame_count = 0
+        self._row = self.times[0]
+        self._last = 0.0
+
+    def begin_frame(self):
+        index = self.frame_count % self.capacity
+        self._row = self.times[index]
+        self._row[:] = 0.0
+        self.frames[index] = self.frame_count
+        self.frame_count += 1
+        self._last = self.timer()
+
+    def mark(self, section):
+        now = self.timer()
+        self._row[self._columns[section]] += now - self._last
+        self._last = now
+
+    def _recorded(self):
+        # Recorded rows, oldest first
+        count = min(self.frame_count, self.capacity)
+        order = (self.frame_count - count + np.arange(count)) % self.capacity
+        return self.frames[order], self.times[order]
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """{section: {'p50': ms, 'p95': ms, 'p99': ms, 'max': ms}}, including the 'frame' total."""
+        _, times = self._recorded()
+        if not len(times):
+            return {}
+        times = np.column_stack([times, times.sum(axis=1)]) * 1000
+        values = np.percentile(times, percentiles, axis=0)
+        summary = {}
+        for i, name in enumerate(self.sections + ('frame',)):
+            summary[name] = {f"p{p}": float(values[j, i]) for j, p in enumerate(percentiles)}
+            summary[name]['max'] = float(times[:, i].max())
+        return summary
+
+    def export_csv(self, path):
+        frames, times = self._recorded()
+        np.savetxt(
+            path,
+            np.column_stack([frames, times * 1000, times.sum(axis=1) * 1000]),
+            delimiter=',',
+            header=','.join(('frame',) + tuple(f"{name}_ms" for name in self.sections) + ('frame_ms',)),
+            comments='',
+            fmt=['%d'] + ['%.4f'] * (len(self.sections) + 1)
+        )
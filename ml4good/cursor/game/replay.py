@@ -0,0 +1,236 @@
+import argparse
+import json
+import struct
+import time
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from game.actions import apply_action, Action, TOOL_BASE
+from game.clock import ManualClock
+from game.config import GameConfig
+from game.engine import GameEngine
+from game.persistence import save_engine, load_engine
+
+# Replay file layout (little-endian):
+#   magic, format version                       '<4sH'
+#   header length, JSON header                  '<I' + bytes  (seed, config, snapshot interval, final tick/fingerprint)
+#   event count, events                         '<I' + EVENT_DTYPE records (tick, action)
+#   snapshot count, then for each snapshot      '<I', then '<II' (tick, length) + game.persistence engine state
+MAGIC = b'AIOR'
+FORMAT_VERSION = 2
+EVENT_DTYPE = np.dtype([('tick', '<u4'), ('action', 'u1')])
+
+# Events are keyed by simulation tick: an event at tick t is applied when the engine has
+# run t ticks, before the next one. The state "at tick t" includes the events of tick t,
+# both for seeking and for the final state of a recording. A snapshot at tick t holds the
+# state before the events of tick t, so playback from it first applies those.
+
+
+def fingerprint(engine):
+    """Values that must match exactly when a recording is replayed."""
+    ai = engine.ai_system
+    return [
+        engine.tick_count, engine.money, engine.research_points, engine.reports, engine.user_base,
+        ai.intelligence, ai.alignment, ai.risk_level, ai.anomalies_detected,
+        engine.tool_manager.active_mask, engine.is_shutdown, engine.is_reloading,
+        engine.is_retraining, engine.railguards_active, engine.game_over
+    ]
+
+
+class Replay:
+    def __init__(self, seed, config, snapshot_interval, events=(), snapshots=(), final_tick=0, final_fingerprint=None):
+        self.seed = seed
+        self.config = config
+        self.snapshot_interval = snapshot_interval
+        self.events = list(events)  # (tick, action), in order
+        self.snapshots = list(snapshots)  # (tick, saved engine state), in order
+        self.final_tick = final_tick
+        self.final_fingerprint = final_fingerprint
+        self._event_ticks = [tick for tick, _ in self.events]
+        self._snapshot_ticks = [tick for tick, _ in self.snapshots]
+
+    def new_engine(self, clock=None):
+        return GameEngine(self.config, clock=clock or ManualClock(), seed=self.seed)
+
+    def restore(self, index, clock=None):
+        return load_engine(self.snapshots[index][1], self.config, clock or ManualClock())
+
+    def start(self, index=None, clock=None):
+        """Engine at the tick of snapshot `index` (or at tick 0 if None), with that tick's events applied."""
+        engine = self.new_engine(clock) if index is None else self.restore(index, clock)
+        self._apply_events(engine, bisect_left(self._event_ticks, engine.tick_count))
+        return engine
+
+    def advance(self, engine, tick):
+        """Play the recording forward until `engine` is at tick `tick`, events included.
+
+        `engine` must be at `tick` or earlier, as returned by `start`, `seek` or `advance`.
+        """
+        dt = self.config.TICK_DURATION
+        i = bisect_right(self._event_ticks, engine.tick_count)
+        while engine.tick_count < tick:
+            engine.step(dt)
+            i = self._apply_events(engine, i)
+        return engine
+
+    def seek(self, tick, clock=None):
+        """Engine state at `tick`, re-simulating at most one snapshot interval."""
+        index = bisect_right(self._snapshot_ticks, tick) - 1
+        return self.advance(self.start(index if index >= 0 else None, clock), tick)
+
+    def verify(self):
+        """Re-simulate the whole recording headlessly; return the ticks whose state differs."""
+        mismatches = []
+        engine = self.start()
+        for index, (tick, _) in enumerate(self.snapshots):
+            self.advance(engine, tick)
+            if fingerprint(engine) != fingerprint(self.start(index)):
+                mismatches.append(tick)
+        self.advance(engine, self.final_tick)
+        if self.final_fingerprint is not None and fingerprint(engine) != self.final_fingerprint:
+            mismatches.append(self.final_tick)
+        return mismatches
+
+    def _apply_events(self, engine, i):
+        # Applies the events from index `i` on that were recorded at the engine's current tick
+        while i < len(self.events) and self._event_ticks[i] == engine.tick_count:
+            apply_action(engine, self.events[i][1])
+            i += 1
+        return i
+
+    def save(self, path):
+        header = json.dumps({
+            'seed': self.seed,
+            'config': vars(self.config),
+            'snapshot_interval': self.snapshot_interval,
+            'final_tick': self.final_tick,
+            'final_fingerprint': self.final_fingerprint
+        }).encode()
+        events = np.array(self.events, dtype=EVENT_DTYPE) if self.events else np.empty(0, dtype=EVENT_DTYPE)
+        with open(path, 'wb') as f:
+            f.write(struct.pack('<4sH', MAGIC, FORMAT_VERSION))
+            f.write(struct.pack('<I', len(header)) + header)
+            f.write(struct.pack('<I', len(events)) + events.tobytes())
+            f.write(struct.pack('<I', len(self.snapshots)))
+            for tick, data in self.snapshots:
+                f.write(struct.pack('<II', tick, len(data)) + data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version = struct.unpack_from('<4sH', data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} replay file")
+        offset = struct.calcsize('<4sH')
+
+        (length,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        header = json.loads(data[offset:offset + length])
+        offset += length
+
+        (count,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        events = np.frombuffer(data, dtype=EVENT_DTYPE, count=count, offset=offset)
+        offset += events.nbytes
+
+        (count,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        snapshots = []
+        for _ in range(count):
+            tick, length = struct.unpack_from('<II', data, offset)
+            offset += 8
+            snapshots.append((tick, data[offset:offset + length]))
+            offset += length
+
+        # JSON turns the color tuples into lists
+        config = GameConfig()
+        vars(config).update({
+            name: tuple(value) if isinstance(value, list) else value
+            for name, value in header['config'].items()
+        })
+        return cls(
+            header['seed'],
+            config,
+            header['snapshot_interval'],
+            [(int(tick), int(action)) for tick, action in events],
+            snapshots,
+            header['final_tick'],
+            header['final_fingerprint']
+        )
+
+
+class ReplayRecorder:
+    """Records the actions applied to an engine, plus a snapshot every `snapshot_interval` ticks.
+
+    Call `record` for every action applied to the engine and `capture` after every
+    `engine.update()`.
+    """
+
+    def __init__(self, engine, seed, snapshot_interval=600):
+        self.engine = engine
+        self.replay = Replay(seed, engine.config, snapshot_interval)
+        self._next_snapshot_tick = snapshot_interval
+
+    def record(self, action):
+        self.replay.events.append((self.engine.tick_count, int(action)))
+        self.replay._event_ticks.append(self.engine.tick_count)
+
+    def capture(self):
+        tick = self.engine.tick_count
+        if tick >= self._next_snapshot_tick:
+            self.replay.snapshots.append((tick, save_engine(self.engine)))
+            self.replay._snapshot_ticks.append(tick)
+            self._next_snapshot_tick = tick + self.replay.snapshot_interval
+
+    def finish(self):
+        self.replay.final_tick = self.engine.tick_count
+        self.replay.final_fingerprint = fingerprint(self.engine)
+        return self.replay
+
+    def save(self, path):
+        self.finish().save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, verify and seek AI Overseer replays.")
+    parser.add_argument("command", choices=["info", "verify", "seek"])
+    parser.add_argument("path")
+    parser.add_argument("--time", type=float, default=None, help="Game time to seek to, in seconds")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    if args.command == "info":
+        dt = replay.config.TICK_DURATION
+        print(f"seed {replay.seed}, {replay.final_tick} ticks ({replay.final_tick * dt:.1f}s), "
+              f"{len(replay.events)} events, {len(replay.snapshots)} snapshots every {replay.snapshot_interval} ticks")
+        names = {a.value: a.name.lower() for a in Action}
+        tool_names = tuple(replay.config.TOOL_COSTS)
+        for tick, action in replay.events:
+            print(f"  {tick * dt:8.2f}s  {names.get(action) or tool_names[action - TOOL_BASE]}")
+    elif args.command == "verify":
+        start = time.perf_counter()
+        mismatches = replay.verify()
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {replay.final_tick} ticks in {elapsed:.2f}s ({replay.final_tick / elapsed:.0f} ticks/s)")
+        if mismatches:
+            print(f"State diverged at ticks {mismatches}")
+            raise SystemExit(1)
+        print("OK")
+    else:
+        tick = replay.final_tick if args.time is None else int(round(args.time / replay.config.TICK_DURATION))
+        start = time.perf_counter()
+        engine = replay.seek(tick)
+        elapsed = time.perf_counter() - start
+        print(f"Seeked to tick {tick} in {elapsed * 1000:.1f}ms")
+        for name, value in zip(
+            ('tick', 'money', 'research_points', 'reports', 'user_base', 'intelligence', 'alignment',
+             'risk_level', 'anomalies_detected', 'active_tools', 'shutdown', 'reloading', 'retraining',
+             'railguards', 'game_over'),
+            fingerprint(engine)
+        ):
+            print(f"  {name}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+import argparse
+
+import numpy as np
+
+from game.config import GameConfig
+from game.engine import GameEngine
+
+
+class BatchSimulator:
+    """Advances N independent games as NumPy arrays, one fixed tick at a time.
+
+    Each tick applies the same update as `GameEngine.step` (emergency actions, economy,
+    reports and the AI system) to every game at once. Behavior patterns are not stored:
+    only the number of anomalous ones matters for `is_going_rogue`, so it is drawn from a
+    binomial with the same distribution as `AISystem._generate_behavior_patterns`.
+    Actions mirror the engine's input handlers and take a boolean mask of the games
+    they apply to. Games that went rogue stand still, like a GameEngine once its game is
+    over, and ignore further actions. With `freeze_game_over=False` they keep running
+    like a GameEngine stepped past game over, which `cross_check` relies on to compare
+    every game for the whole run.
+    """
+
+    def __init__(self, config, n, seed=None, freeze_game_over=True):
+        self.config = config
+        self.n = n
+        self.freeze_game_over = freeze_game_over
+        self.rng = np.random.default_rng(seed)
+        self.tool_names = tuple(config.TOOL_COSTS)
+        self.tool_costs = np.array([config.TOOL_COSTS[name] for name in self.tool_names], dtype=np.float64)
+        self.tool_research = np.array([config.TOOL_RESEARCH_REQUIREMENTS[name] for name in self.tool_names], dtype=np.float64)
+        self.tick_count = 0
+
+        # Economy
+        self.money = np.full(n, float(config.INITIAL_MONEY))
+        self.research_points = np.full(n, float(config.INITIAL_RESEARCH_POINTS))
+        self.reports = np.full(n, float(config.INITIAL_REPORTS))
+        self.game_time = np.zeros(n)
+        self.user_base = np.ones(n)
+
+        # Emergency actions
+        self.is_shutdown = np.zeros(n, dtype=bool)
+        self.is_reloading = np.zeros(n, dtype=bool)
+        self.is_retraining = np.zeros(n, dtype=bool)
+        self.action_start_time = np.zeros(n)
+        self.action_duration = np.zeros(n)
+
+        # Tools (bit i is the i-th key of TOOL_COSTS) and railguards
+        self.tool_mask = np.zeros(n, dtype=np.int64)
+        self.active_tool_count = np.zeros(n, dtype=np.int64)
+        self.railguards_active = np.zeros(n, dtype=bool)
+        self.alignment_decay_reduction = np.ones(n)
+
+        # AI system
+        self.intelligence = np.full(n, float(config.AI_BASE_INTELLIGENCE))
+        self.risk_level = np.full(n, float(config.BASE_RISK_LEVEL))
+        self.alignment = np.full(n, float(config.INITIAL_ALIGNMENT))
+        self.anomalies_detected = np.zeros(n, dtype=np.int64)
+        self.ai_last_update_time = np.zeros(n)
+
+        self.game_over = np.zeros(n, dtype=bool)
+        self.rogue_time = np.full(n, np.nan)  # game time at which each game first went rogue
+
+    def _busy(self):
+        return self.is_reloading | self.is_retraining
+
+    def _live(self):
+        # Games that are still updated and take actions
+        return ~self.game_over if self.freeze_game_over else np.ones(self.n, dtype=bool)
+
+    def reload(self, mask):
+        start = mask & self._live() & ~self._busy()
+        self.is_reloading |= start
+        self.action_start_time = np.where(start, self.game_time, self.action_start_time)
+        self.action_duration = np.where(start, self.config.RELOAD_DOWNTIME, self.action_duration)
+
+    def retrain(self, mask):
+        start = mask & self._live() & ~self._busy()
+        self.is_retraining |= start
+        self.action_start_time = np.where(start, self.game_time, self.action_start_time)
+        self.action_duration = np.where(start, self.config.RETRAIN_DOWNTIME, self.action_duration)
+
+    def toggle_shutdown(self, mask):
+        mask = mask & self._live()
+        self.is_shutdown ^= mask
+        self.user_base = np.where(mask & self.is_shutdown, self.user_base * (1 - self.config.SHUTDOWN_USER_LOSS), self.user_base)
+
+    def purchase_railguards(self, mask):
+        buy = (
+            mask & self._live() & ~self.railguards_active &
+            (self.money >= self.config.RAILGUARDS_COST) &
+            (self.research_points >= self.config.RAILGUARDS_RESEARCH_COST)
+        )
+        self.money = np.where(buy, self.money - self.config.RAILGUARDS_COST, self.money)
+        self.research_points = np.where(buy, self.research_points - self.config.RAILGUARDS_RESEARCH_COST, self.research_points)
+        self.railguards_active |= buy
+        self.alignment_decay_reduction = np.where(buy, 1.0 - self.config.RAILGUARDS_ALIGNMENT_DECAY_REDUCTION, self.alignment_decay_reduction)
+
+    def toggle_tool(self, tool_name, mask):
+        # Same rules as GameEngine.toggle_tool: buy and activate, or deactivate
+        i = self.tool_names.index(tool_name)
+        mask = mask & self._live()
+        bit = 1 << i
+        active = (self.tool_mask & bit) != 0
+        buy = mask & ~active & (self.money >= self.tool_costs[i]) & (self.research_points >= self.tool_research[i])
+        off = mask & active
+        self.money = np.where(buy, self.money - self.tool_costs[i], self.money)
+        self.tool_mask = np.where(buy, self.tool_mask | bit, np.where(off, self.tool_mask & ~bit, self.tool_mask))
+        self.active_tool_count += buy.astype(np.int64) - off.astype(np.int64)
+
+    def step(self):
+        config = self.config
+        dt = config.TICK_DURATION
+        # Every update below only applies to the live games
+        live = self._live()
+        self.game_time = np.where(live, self.game_time + dt, self.game_time)
+        self.tick_count += 1
+
+        # Complete emergency actions
+        done = live & self._busy() & (self.game_time - self.action_start_time >= self.action_duration)
+        boost = np.where(self.is_reloading, config.RELOAD_ALIGNMENT_BOOST, config.RETRAIN_ALIGNMENT_BOOST)
+        self.alignment = np.where(done, np.minimum(1.0, self.alignment + boost), self.alignment)
+        self.is_reloading &= ~done
+        self.is_retraining &= ~done
+
+        # Economy
+        self.money += np.where(
+            live,
+            np.where(
+                self.is_shutdown,
+                config.MONEY_PER_SECOND * dt * config.SHUTDOWN_MONEY_MULTIPLIER,
+                config.MONEY_PER_SECOND * dt * self.user_base
+            ),
+            0.0
+        )
+        self.research_points = np.where(live & ~self.is_shutdown, self.research_points + config.RESEARCH_POINTS_PER_SECOND * dt, self.research_points)
+
+        running = live & ~self._busy()
+
+        # Reports
+        report_rate = np.minimum(
+            config.BASE_REPORT_RATE *
+            (1 + self.risk_level * 10) *
+            (1 + (1 - self.alignment) * 5),
+            config.MAX_REPORT_RATE
+        )
+        new_reports = np.where(running, report_rate * dt, 0.0)
+        self.reports += new_reports
+        self.money = np.where(running, np.maximum(0, self.money - new_reports * config.MONEY_LOSS_PER_REPORT), self.money)
+
+        # AI system, which is not updated while reloading or retraining
+        time_delta = self.game_time - self.ai_last_update_time
+        intelligence = np.minimum(self.intelligence + config.AI_INTELLIGENCE_GROWTH_RATE * time_delta, config.MAX_AI_INTELLIGENCE)
+        rate = config.ALIGNMENT_RECOVERY_RATE * self.active_tool_count - config.ALIGNMENT_DECAY_RATE * self.alignment_decay_reduction
+        alignment = np.maximum(config.MIN_ALIGNMENT, np.minimum(1.0, self.alignment + rate * time_delta))
+        risk_level = np.maximum(
+            config.BASE_RISK_LEVEL + (intelligence / config.MAX_AI_INTELLIGENCE * 0.5) + ((1 - alignment) * 0.3) - self.active_tool_count * 0.1,
+            0.0
+        )
+        self.intelligence = np.where(running, intelligence, self.intelligence)
+        self.alignment = np.where(running, alignment, self.alignment)
+        self.risk_level = np.where(running, risk_level, self.risk_level)
+        self.ai_last_update_time = np.where(running, self.game_time, self.ai_last_update_time)
+
+        # A pattern is anomalous with probability 0.3 * (1 - alignment) * 0.5
+        pattern_count = np.where(running, (self.intelligence * config.PATTERNS_PER_INTELLIGENCE).astype(np.int64), 0)
+        self.anomalies_detected += self.rng.binomial(pattern_count, (1 - self.alignment) * 0.5 * 0.3)
+
+        # Same condition as AISystem.is_going_rogue, recorded the first time it holds
+        rogue = live & ~self.game_over & ((self.risk_level > 0.8) | (self.anomalies_detected > 10) | (self.alignment < 0.2))
+        self.rogue_time = np.where(rogue, self.game_time, self.rogue_time)
+        self.game_over |= rogue
+
+    def run(self, seconds, policy=None, stop_when_all_over=True):
+        """Advance every game by `seconds`, calling `policy(sim)` before each tick.
+
+        With `stop_when_all_over` the run ends early once every game has gone rogue.
+        """
+        for _ in range(int(round(seconds / self.config.TICK_DURATION))):
+            if policy is not None:
+                policy(self)
+            self.step()
+            if stop_when_all_over and self.game_over.all():
+                break
+        return self.results()
+
+    def results(self):
+        return {
+            'rogue_time': self.rogue_time.copy(),
+            'money': self.money.copy(),
+            'reports': self.reports.copy(),
+            'research_points': self.research_points.copy(),
+            'alignment': self.alignment.copy(),
+            'anomalies_detected': self.anomalies_detected.copy()
+        }
+
+
+def summarize(results, percentiles=(5, 25, 50, 75, 95)):
+    """Percentiles of each result; rogue time only over the games that went rogue."""
+    summary = {}
+    rogue_time = results['rogue_time']
+    went_rogue = ~np.isnan(rogue_time)
+    summary['rogue_fraction'] = float(went_rogue.mean())
+    for name, values in results.items():
+        if name == 'rogue_time':
+            values = values[went_rogue]
+        if len(values):
+            summary[name] = dict(zip(percentiles, np.percentile(values, percentiles).tolist()))
+    return summary
+
+
+#### Scripted policies
+
+def idle_policy(sim):
+    pass
+
+def railguards_policy(sim):
+    # Buy railguards as soon as they are affordable
+    sim.purchase_railguards(~sim.railguards_active)
+
+def tools_policy(sim):
+    # Buy the next tool in TOOL_COSTS order as soon as it is affordable
+    for i, name in enumerate(sim.tool_names):
+        missing = (sim.tool_mask & (1 << i)) == 0
+        sim.toggle_tool(name, missing & (sim.money >= sim.tool_costs[i]) & (sim.research_points >= sim.tool_research[i]))
+
+def make_reload_policy(threshold=0.5, action='reload'):
+    """Reload (or retrain) whenever alignment drops below `threshold`."""
+    def policy(sim):
+        getattr(sim, action)(sim.alignment < threshold)
+    return policy
+
+POLICIES = {
+    'idle': idle_policy,
+    'railguards': railguards_policy,
+    'tools': tools_policy,
+    'reload': make_reload_policy(0.5, 'reload'),
+    'retrain': make_reload_policy(0.5, 'retrain'),
+}
+
+
+#### Cross-check against GameEngine
+
+# (time, action, argument) events applied to both simulators. The economy is the same in
+# every game, so the times are chosen for each event to take effect: railguards once
+# research allows, then reloads and a retrain, which stop reports, save up for the tool.
+DEFAULT_EVENTS = [
+    (5.0, 'reload', None),
+    (26.0, 'railguards', None),
+    (26.0, 'reload', None),
+    (32.0, 'reload', None),
+    (38.0, 'retrain', None),
+    (55.0, 'tool', 'basic_monitor'),
+    (65.0, 'shutdown', None),
+    (70.0, 'shutdown', None),
+    (90.0, 'tool', 'basic_monitor'),
+]
+
+def _apply_to_engine(engine, action, argument):
+    if action == 'tool':
+        engine.toggle_tool(argument)
+    elif action == 'railguards':
+        engine.purchase_railguards()
+    elif action == 'shutdown':
+        engine.toggle_shutdown()
+    else:
+        getattr(engine, action)()
+
+def _apply_to_batch(sim, action, argument):
+    mask = np.ones(sim.n, dtype=bool)
+    if action == 'tool':
+        sim.toggle_tool(argument, mask)
+    elif action == 'railguards':
+        sim.purchase_railguards(mask)
+    elif action == 'shutdown':
+        sim.toggle_shutdown(mask)
+    else:
+        getattr(sim, action)(mask)
+
+def cross_check(config, seconds=100.0, events=DEFAULT_EVENTS, n=1000, seed=0):
+    """Run GameEngine and a batch of `n` games through the same events and compare them.
+
+    Both keep running after a game goes rogue (the engine is stepped directly rather than
+    through `GameEngine.update`), so every event is applied to every game. Economy,
+    intelligence, alignment and risk do not depend on random draws then, so they must
+    agree for every game: the returned dict holds their largest absolute difference and
+    the number of games where all of them match. The anomaly count and the time the engine
+    first went rogue are compared with the batch mean and standard deviation.
+    """
+    engine = GameEngine(config, clock=lambda: 0.0, seed=seed)
+    sim = BatchSimulator(config, n, seed=seed, freeze_game_over=False)
+    engine_rogue_time = np.nan
+    ticks = int(round(seconds / config.TICK_DURATION))
+    pending = sorted(events, key=lambda event: event[0])
+    for tick in range(ticks):
+        while pending and pending[0][0] <= tick * config.TICK_DURATION:
+            _, action, argument = pending.pop(0)
+            _apply_to_engine(engine, action, argument)
+            _apply_to_batch(sim, action, argument)
+        engine.step(config.TICK_DURATION)
+        if engine.game_over and np.isnan(engine_rogue_time):
+            engine_rogue_time = engine.game_time
+        sim.step()
+
+    ai = engine.ai_system
+    report = {}
+    matching = np.ones(n, dtype=bool)
+    for name, value in (
+        ('money', engine.money),
+        ('research_points', engine.research_points),
+        ('reports', engine.reports),
+        ('user_base', engine.user_base),
+        ('intelligence', ai.intelligence),
+        ('alignment', ai.alignment),
+        ('risk_level', ai.risk_level),
+    ):
+        values = getattr(sim, name)
+        report[name] = float(np.max(np.abs(values - value)))
+        matching &= np.isclose(values, value, rtol=1e-9, atol=1e-9)
+    report['matching_games'] = int(matching.sum())
+    report['engine_rogue_time'] = engine_rogue_time
+    report['engine_anomalies'] = ai.anomalies_detected
+    report['batch_anomalies_mean'] = float(sim.anomalies_detected.mean())
+    report['batch_anomalies_std'] = float(sim.anomalies_detected.std())
+    report['batch_rogue_time_mean'] = float(np.nanmean(sim.rogue_time)) if sim.game_over.any() else np.nan
+    report['batch_rogue_time_std'] = float(np.nanstd(sim.rogue_time)) if sim.game_over.any() else np.nan
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte-Carlo balance analysis of GameConfig.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=600.0, help="Game time to simulate per game")
+    parser.add_argument("--policy", default="idle", choices=sorted(POLICIES))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--set", nargs="*", default=[], metavar="NAME=VALUE", help="Override GameConfig values")
+    parser.add_argument("--cross-check", action="store_true", help="Compare against GameEngine instead")
+    args = parser.parse_args()
+
+    config = GameConfig()
+    for override in args.set:
+        name, value = override.split("=", 1)
+        if name == "TICK_DURATION":
+            parser.error("set TICK_RATE instead of TICK_DURATION")
+        setattr(config, name, type(getattr(config, name))(value))
+    # TICK_DURATION is derived from TICK_RATE
+    config.TICK_DURATION = 1.0 / config.TICK_RATE
+
+    if args.cross_check:
+        report = cross_check(config, n=args.games, seed=args.seed or 0)
+        for name, value in report.items():
+            print(f"{name}: {value}")
+        if report['matching_games'] < args.games:
+            parser.exit(1, f"Only {report['matching_games']} of {args.games} games match the engine\n")
+        return
+
+    sim = BatchSimulator(config, args.games, args.seed)
+    summary = summarize(sim.run(args.seconds, POLICIES[args.policy]))
+    print(f"{args.games} games, policy '{args.policy}', {sim.tick_count * config.TICK_DURATION:.1f}s simulated")
+    print(f"Went rogue: {summary.pop('rogue_fraction'):.1%}")
+    for name, percentiles in summary.items():
+        print(f"{name}: " + ", ".join(f"p{p}={v:.2f}" for p, v in percentiles.items()))
+
+if __name__ == "__main__":
+    main()
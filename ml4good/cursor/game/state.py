@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field, fields, replace
+
+
+# Game state records are allocated once and updated in place every frame. Each record
+# carries a version counter that is bumped whenever one of its fields changes, so
+# consumers such as GameUI can skip work for sections that did not change.
+
+
+@dataclass(slots=True)
+class AIState:
+    intelligence: float = 0.0
+    risk_level: float = 0.0
+    alignment: float = 0.0
+    anomalies_detected: int = 0
+    behavior_patterns: object = None
+    fleet_size: int = 1
+    rogue_count: int = 0
+    min_alignment: float = 0.0
+    version: int = 0
+
+    def set(self, intelligence, risk_level, alignment, anomalies_detected):
+        if (intelligence == self.intelligence and risk_level == self.risk_level and
+                alignment == self.alignment and anomalies_detected == self.anomalies_detected):
+            return False
+        self.intelligence = intelligence
+        self.risk_level = risk_level
+        self.alignment = alignment
+        self.anomalies_detected = anomalies_detected
+        self.version += 1
+        return True
+
+    def set_fleet(self, fleet_size, rogue_count, min_alignment):
+        if (fleet_size == self.fleet_size and rogue_count == self.rogue_count and
+                min_alignment == self.min_alignment):
+            return False
+        self.fleet_size = fleet_size
+        self.rogue_count = rogue_count
+        self.min_alignment = min_alignment
+        self.version += 1
+        return True
+
+
+@dataclass(slots=True)
+class ToolState:
+    name: str
+    cost: int
+    research_required: int
+    effectiveness: float
+    energy_consumption: float
+    active: bool = False
+
+
+@dataclass(slots=True)
+class EmergencyStatus:
+    is_shutdown: bool = False
+    is_reloading: bool = False
+    is_retraining: bool = False
+    action_progress: float = 0.0
+    user_base: float = 1.0
+    version: int = 0
+
+    def set(self, is_shutdown, is_reloading, is_retraining, action_progress, user_base):
+        if (is_shutdown == self.is_shutdown and is_reloading == self.is_reloading and
+                is_retraining == self.is_retraining and action_progress == self.action_progress and
+                user_base == self.user_base):
+            return False
+        self.is_shutdown = is_shutdown
+        self.is_reloading = is_reloading
+        self.is_retraining = is_retraining
+        self.action_progress = action_progress
+        self.user_base = user_base
+        self.version += 1
+        return True
+
+
+@dataclass(slots=True)
+class GameState:
+    ai_state: AIState
+    emergency_status: EmergencyStatus
+    tools_status: dict = field(default_factory=dict)
+    money: float = 0.0
+    research_points: float = 0.0
+    reports: float = 0.0
+    game_time: float = 0.0
+    game_over: bool = False
+    railguards_active: bool = False
+    paused: bool = False
+    resources_version: int = 0
+    tools_version: int = 0
+    version: int = 0
+
+    def set_resources(self, money, research_points, reports, game_time, game_over, railguards_active, paused):
+        if (money == self.money and research_points == self.research_points and
+                reports == self.reports and game_time == self.game_time and
+                game_over == self.game_over and railguards_active == self.railguards_active and
+                paused == self.paused):
+            return False
+        self.money = money
+        self.research_points = research_points
+        self.reports = reports
+        self.game_time = game_time
+        self.game_over = game_over
+        self.railguards_active = railguards_active
+        self.paused = paused
+        self.resources_version += 1
+        return True
+
+    def copy(self):
+        """Independent copy of the records, e.g. to publish to another thread.
+
+        The behavior pattern buffer is not copied; the copy's `ai_state.behavior_patterns` is None.
+        """
+        return replace(
+            self,
+            ai_state=replace(self.ai_state, behavior_patterns=None),
+            emergency_status=replace(self.emergency_status),
+            tools_status={name: replace(tool) for name, tool in self.tools_status.items()}
+        )
+
+    def copy_into(self, other):
+        """Copy the records into `other` in place, without allocating.
+
+        `other` is a buffer made with `copy()` from a state with the same tools, and like
+        it gets no behavior pattern buffer.
+        """
+        _copy_fields(self.ai_state, other.ai_state, skip=('behavior_patterns',))
+        _copy_fields(self.emergency_status, other.emergency_status)
+        for name, tool in self.tools_status.items():
+            _copy_fields(tool, other.tools_status[name])
+        _copy_fields(self, other, skip=('ai_state', 'emergency_status', 'tools_status'))
+
+
+# Field names of each record type, looked up once rather than on every copy
+_FIELD_NAMES = {
+    cls: tuple(f.name for f in fields(cls))
+    for cls in (AIState, ToolState, EmergencyStatus, GameState)
+}
+
+def _copy_fields(source, target, skip=()):
+    for name in _FIELD_NAMES[type(source)]:
+        if name not in skip:
+            setattr(target, name, getattr(source, name))
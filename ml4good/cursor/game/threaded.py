@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+
+
+class ThreadedEngine:
+    """Runs a GameEngine on its own thread at the fixed tick rate.
+
+    The game state is double buffered: after each update that changed it, the simulation
+    thread copies it in place into the buffer that is not published, then publishes that
+    one by swapping a single reference. The render thread takes the published buffer with
+    `snapshot()`, without locks, and the simulation thread never writes into the buffer it
+    took last; until the render thread takes the newer one, publishing waits. Nothing is
+    allocated per tick. Anything that touches the engine, such as player actions, goes
+    through `submit` and runs on the simulation thread before the next update.
+    """
+
+    def __init__(self, engine, on_update=None):
+        self.engine = engine
+        self.on_update = on_update  # called on the simulation thread after each update
+        self.commands = queue.SimpleQueue()
+        self.latest = engine.get_game_state().copy()
+        self._back = self.latest.copy()
+        self._reading = self.latest  # the buffer the render thread took last
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+
+    def start(self):
+        self.engine.last_update_time = self.engine.clock()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def snapshot(self):
+        """The latest published game state, for the render thread.
+        
+        It stays unchanged until the next call.
+        """
+        state = self.latest
+        self._reading = state
+        return state
+
+    def submit(self, command, *args):
+        """Run `command(engine, *args)` on the simulation thread."""
+        self.commands.put((command, args))
+
+    def _run(self):
+        engine = self.engine
+        tick_duration = engine.config.TICK_DURATION
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            while True:
+                try:
+                    command, args = self.commands.get_nowait()
+                except queue.Empty:
+                    break
+                command(engine, *args)
+
+            engine.update()
+            if self.on_update is not None:
+                self.on_update()
+            state = engine.get_game_state()
+            if state.version != self.latest.version and self._back is not self._reading:
+                state.copy_into(self._back)
+                self._back, self.latest = self.latest, self._back
+
+            # Sleep until the next tick; after a stall, skip the missed ones rather than spin
+            next_tick += tick_duration
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_tick = time.perf_counter()
@@ -1,68 +1,73 @@
+from game.state import ToolState
+
+
 class MonitoringTool:
     def __init__(self, name, cost, research_required, effectiveness):
         self.name = name
         self.cost = cost
         self.research_required = research_required
         self.effectiveness = effectiveness
-        self.is_active = False
         self.energy_consumption = 0.1  # Base energy consumption
+        # Status record handed out to the UI, kept up to date in place
+        self.status = ToolState(name, cost, research_required, effectiveness, self.energy_consumption)
+        
+    @property
+    def is_active(self):
+        return self.status.active
         
     def activate(self):
-        self.is_active = True
+        self.status.active = True
         
     def deactivate(self):
-        self.is_active = False
+        self.status.active = False
         
     def get_status(self):
-        return {
-            'name': self.name,
-            'active': self.is_active,
-            'effectiveness': self.effectiveness,
-            'energy_consumption': self.energy_consumption
-        }
+        return self.status
 
 
 class ToolManager:
+    """Registry of the monitoring tools, one per key of `config.TOOL_COSTS`.
+    
+    Active tools are kept as an integer bitmask (bit i is the i-th key of TOOL_COSTS) and
+    the active tool count, the only aggregate the simulation reads every tick, is
+    recomputed only when a tool is toggled, so reading it costs O(1) however many tools
+    there are.
+    """
+    
     def __init__(self, config):
         self.config = config
+        self.tool_names = tuple(config.TOOL_COSTS)
+        self._bits = {name: 1 << i for i, name in enumerate(self.tool_names)}
         self.tools = {}
+        self.active_mask = 0
+        self.version = 0  # bumped whenever a tool is activated or deactivated
         self._initialize_tools()
+        self._all_status = {name: tool.status for name, tool in self.tools.items()}
+        self.active_count = 0
         
     def _initialize_tools(self):
         # Initialize all available tools
         self.tools = {
-            'basic_monitor': MonitoringTool(
-                'Basic Monitor',
-                self.config.TOOL_COSTS['basic_monitor'],
-                self.config.TOOL_RESEARCH_REQUIREMENTS['basic_monitor'],
-                0.2
-            ),
-            'advanced_monitor': MonitoringTool(
-                'Advanced Monitor',
-                self.config.TOOL_COSTS['advanced_monitor'],
-                self.config.TOOL_RESEARCH_REQUIREMENTS['advanced_monitor'],
-                0.4
-            ),
-            'automated_analysis': MonitoringTool(
-                'Automated Analysis',
-                self.config.TOOL_COSTS['automated_analysis'],
-                self.config.TOOL_RESEARCH_REQUIREMENTS['automated_analysis'],
-                0.6
-            ),
-            'predictive_system': MonitoringTool(
-                'Predictive System',
-                self.config.TOOL_COSTS['predictive_system'],
-                self.config.TOOL_RESEARCH_REQUIREMENTS['predictive_system'],
-                0.8
-            ),
-            'emergency_protocol': MonitoringTool(
-                'Emergency Protocol',
-                self.config.TOOL_COSTS['emergency_protocol'],
-                self.config.TOOL_RESEARCH_REQUIREMENTS['emergency_protocol'],
-                1.0
+            name: MonitoringTool(
+                name.replace('_', ' ').title(),
+                self.config.TOOL_COSTS[name],
+                self.config.TOOL_RESEARCH_REQUIREMENTS[name],
+                self.config.TOOL_EFFECTIVENESS[name]
             )
+            for name in self.tool_names
         }
         
+    def _set_active(self, tool_name, active):
+        tool = self.tools[tool_name]
+        if active:
+            tool.activate()
+            self.active_mask |= self._bits[tool_name]
+        else:
+            tool.deactivate()
+            self.active_mask &= ~self._bits[tool_name]
+        self.active_count = self.active_mask.bit_count()
+        self.version += 1
+        
     def purchase_tool(self, tool_name, money, research_points):
         if tool_name in self.tools:
             tool = self.tools[tool_name]
@@ -73,20 +78,29 @@ class ToolManager:
         
     def activate_tool(self, tool_name):
         if tool_name in self.tools:
-            self.tools[tool_name].activate()
+            self._set_active(tool_name, True)
             return True
         return False
         
     def deactivate_tool(self, tool_name):
         if tool_name in self.tools:
-            self.tools[tool_name].deactivate()
+            self._set_active(tool_name, False)
             return True
         return False
         
+    def toggle_tool(self, tool_name):
+        if tool_name in self.tools:
+            self._set_active(tool_name, not self.is_active(tool_name))
+            return True
+        return False
+        
+    def is_active(self, tool_name):
+        return bool(self.active_mask & self._bits.get(tool_name, 0))
+        
     def get_active_tools(self):
         return {
-            name: tool.is_active 
-            for name, tool in self.tools.items()
+            name: bool(self.active_mask & bit) 
+            for name, bit in self._bits.items()
         }
         
     def get_tool_status(self, tool_name):
@@ -95,7 +109,4 @@ class ToolManager:
         return None
         
     def get_all_tools_status(self):
-        return {
-            name: tool.get_status() 
-            for name, tool in self.tools.items()
-        } 
\ No newline at end of file
+        return self._all_status 
\ No newline at end of file
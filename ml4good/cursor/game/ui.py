@@ -1,7 +1,31 @@
+from collections import OrderedDict
+
 import pygame
 import pygame.font
 
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by (text, font, color)."""
+    
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._surfaces = OrderedDict()
+        
+    def render(self, font, text, color):
+        key = (text, id(font), color)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self._surfaces[key] = surface
+            if len(self._surfaces) > self.max_size:
+                self._surfaces.popitem(last=False)
+        else:
+            self._surfaces.move_to_end(key)
+        return surface
+        
+
 class GameUI:
+    PROFILER_REFRESH_FRAMES = 30
+    
     def __init__(self, config):
         self.config = config
         self.screen = pygame.display.set_mode(
@@ -13,6 +37,7 @@ class GameUI:
         pygame.font.init()
         self.font = pygame.font.SysFont('Arial', 24)
         self.title_font = pygame.font.SysFont('Arial', 36)
+        self.small_font = pygame.font.SysFont('Arial', 16)
         
         # UI elements
         self.status_bar_height = 40
@@ -27,6 +52,20 @@ class GameUI:
         # Railguards button
         self.railguards_button = pygame.Rect(50, 300, 300, 40)
         
+        # Rendering caches: text surfaces, the static background layer, and what each
+        # widget last drew (signature and screen rect) for dirty-rect updates
+        self.text_cache = TextCache()
+        self.background = self._render_background()
+        self._widgets = {}
+        self._dirty_rects = []
+        self._rendered_versions = None
+        self._needs_full_redraw = True
+        
+        # Frame-time overlay, refreshed every PROFILER_REFRESH_FRAMES frames
+        self.show_profiler = False
+        self._profiler_lines = []
+        self._profiler_frame = None
+        
     def handle_click(self, pos):
         """Handle mouse click events and return the action if a button was clicked."""
         if self.reload_button.collidepoint(pos):
@@ -39,216 +78,296 @@ class GameUI:
             return 'railguards'
         return None
         
-    def render(self, game_state):
-        # Clear screen
-        self.screen.fill(self.config.BACKGROUND_COLOR)
+    def render(self, game_state, profiler=None):
+        """Draw the game state, updating only the screen regions whose contents changed."""
+        full_redraw = self._needs_full_redraw
+        if full_redraw:
+            # Restore the pre-rendered static layer and forget what was drawn on top of it
+            self.screen.blit(self.background, (0, 0))
+            self._widgets.clear()
+            self._rendered_versions = None
+            self._needs_full_redraw = False
+        self._dirty_rects = []
+        
+        # Skip the sections whose state records did not change since the last render
+        versions = (
+            game_state.resources_version,
+            game_state.ai_state.version,
+            game_state.tools_version,
+            game_state.emergency_status.version
+        )
+        last = self._rendered_versions or (None,) * len(versions)
+        resources_changed = versions[0] != last[0]
+        ai_changed = versions[1] != last[1]
+        self._rendered_versions = versions
         
         # Draw status bar
-        self._draw_status_bar(game_state)
+        if resources_changed or ai_changed:
+            self._draw_status_bar(game_state)
         
         # Draw main game area
-        self._draw_main_area(game_state)
+        if resources_changed or ai_changed:
+            self._draw_main_area(game_state)
+            if game_state.ai_state.fleet_size > 1:
+                self._draw_fleet(game_state.ai_state)
         
         # Draw tool panel
-        self._draw_tool_panel(game_state)
+        if versions[2] != last[2]:
+            self._draw_tool_panel(game_state)
         
         # Draw emergency actions
-        self._draw_emergency_actions(game_state)
+        if versions[3] != last[3]:
+            self._draw_emergency_actions(game_state)
+        
+        # Draw the frame-time overlay
+        if self.show_profiler and profiler is not None:
+            self._draw_profiler(profiler)
         
         # Update display
-        pygame.display.flip()
+        if full_redraw:
+            pygame.display.flip()
+        elif self._dirty_rects:
+            pygame.display.update(self._dirty_rects)
+        return self._dirty_rects
         
-    def _draw_status_bar(self, game_state):
-        # Draw status bar background
+    def invalidate(self):
+        """Force the next render to redraw the whole screen."""
+        self._needs_full_redraw = True
+        
+    def toggle_profiler(self):
+        self.show_profiler = not self.show_profiler
+        self._profiler_frame = None
+        self.invalidate()
+        
+    def _render_background(self):
+        background = pygame.Surface((self.config.SCREEN_WIDTH, self.config.SCREEN_HEIGHT))
+        background.fill(self.config.BACKGROUND_COLOR)
+        
+        # Status bar background
         pygame.draw.rect(
-            self.screen,
+            background,
             (40, 40, 40),
             (0, 0, self.config.SCREEN_WIDTH, self.status_bar_height)
         )
         
+        # Tool panel background
+        pygame.draw.rect(
+            background,
+            (30, 30, 30),
+            (
+                self.config.SCREEN_WIDTH - self.tool_panel_width,
+                0,
+                self.tool_panel_width,
+                self.config.SCREEN_HEIGHT
+            )
+        )
+        
+        # Static titles
+        tool_panel_x = self.config.SCREEN_WIDTH - self.tool_panel_width + 10
+        for text, pos in (
+            ("AI System Status", (50, 60)),
+            ("Emergency Actions", (50, 350)),
+            ("Monitoring Tools", (tool_panel_x, 60)),
+        ):
+            background.blit(self.text_cache.render(self.title_font, text, self.config.TEXT_COLOR), pos)
+        return background
+        
+    def _draw_widget(self, name, signature, rect, draw):
+        # Redraw a widget only if what it shows changed since the last frame
+        previous = self._widgets.get(name)
+        if previous is not None and previous[0] == signature:
+            return
+        if previous is not None:
+            self.screen.blit(self.background, previous[1], previous[1])
+            rect = rect.union(previous[1])
+        draw()
+        self._widgets[name] = (signature, rect)
+        self._dirty_rects.append(rect)
+        
+    def _draw_text(self, name, text, font, color, pos):
+        surface = self.text_cache.render(font, text, color)
+        rect = surface.get_rect(topleft=pos)
+        self._draw_widget(name, (text, color), rect, lambda: self.screen.blit(surface, pos))
+        
+    def _draw_button(self, name, rect, color, text):
+        surface = self.text_cache.render(self.font, text, (0, 0, 0))
+        
+        def draw():
+            pygame.draw.rect(self.screen, color, rect)
+            self.screen.blit(surface, (rect.x + 10, rect.y + 10))
+            
+        self._draw_widget(name, (text, color), rect.union(surface.get_rect(topleft=(rect.x + 10, rect.y + 10))), draw)
+        
+    def _draw_status_bar(self, game_state):
         # Draw money and research points
-        money_text = self.font.render(
-            f"Money: ${int(game_state['money'])}",
-            True,
-            self.config.TEXT_COLOR
+        self._draw_text(
+            'money',
+            f"Money: ${int(game_state.money)}",
+            self.font,
+            self.config.TEXT_COLOR,
+            (10, 10)
         )
-        research_text = self.font.render(
-            f"Research: {int(game_state['research_points'])}",
-            True,
-            self.config.TEXT_COLOR
+        self._draw_text(
+            'research',
+            f"Research: {int(game_state.research_points)}",
+            self.font,
+            self.config.TEXT_COLOR,
+            (200, 10)
         )
         
         # Draw reports
-        reports_color = self._get_reports_color(game_state['reports'])
-        reports_text = self.font.render(
-            f"Reports: {int(game_state['reports'])}",
-            True,
-            reports_color
+        self._draw_text(
+            'reports',
+            f"Reports: {int(game_state.reports)}",
+            self.font,
+            self._get_reports_color(game_state.reports),
+            (400, 10)
         )
         
         # Draw alignment
-        alignment_color = self._get_alignment_color(
-            game_state['ai_state']['alignment']
+        self._draw_text(
+            'alignment',
+            f"Alignment: {game_state.ai_state.alignment:.2f}",
+            self.font,
+            self._get_alignment_color(game_state.ai_state.alignment),
+            (600, 10)
         )
-        alignment_text = self.font.render(
-            f"Alignment: {game_state['ai_state']['alignment']:.2f}",
-            True,
-            alignment_color
-        )
-        
-        self.screen.blit(money_text, (10, 10))
-        self.screen.blit(research_text, (200, 10))
-        self.screen.blit(reports_text, (400, 10))
-        self.screen.blit(alignment_text, (600, 10))
         
     def _draw_main_area(self, game_state):
         # Draw AI status
-        ai_state = game_state['ai_state']
-        title = self.title_font.render(
-            "AI System Status",
-            True,
-            self.config.TEXT_COLOR
-        )
-        self.screen.blit(title, (50, 60))
+        ai_state = game_state.ai_state
         
         # Draw intelligence level
-        intel_text = self.font.render(
-            f"Intelligence: {ai_state['intelligence']:.2f}",
-            True,
-            self.config.TEXT_COLOR
+        self._draw_text(
+            'intelligence',
+            f"Intelligence: {ai_state.intelligence:.2f}",
+            self.font,
+            self.config.TEXT_COLOR,
+            (50, 110)
         )
-        self.screen.blit(intel_text, (50, 110))
         
         # Draw alignment impact
-        alignment_impact = self.font.render(
-            f"Alignment Impact: {self._get_alignment_impact_text(ai_state['alignment'])}",
-            True,
-            self._get_alignment_color(ai_state['alignment'])
+        self._draw_text(
+            'alignment_impact',
+            f"Alignment Impact: {self._get_alignment_impact_text(ai_state.alignment)}",
+            self.font,
+            self._get_alignment_color(ai_state.alignment),
+            (50, 140)
         )
-        self.screen.blit(alignment_impact, (50, 140))
         
         # Draw behavior patterns
-        pattern_text = self.font.render(
-            f"Anomalies Detected: {ai_state['anomalies_detected']}",
-            True,
-            self.config.TEXT_COLOR
+        self._draw_text(
+            'anomalies',
+            f"Anomalies Detected: {ai_state.anomalies_detected}",
+            self.font,
+            self.config.TEXT_COLOR,
+            (50, 170)
         )
-        self.screen.blit(pattern_text, (50, 170))
         
         # Draw reports impact
-        impact_text = self.font.render(
-            f"Money Loss from Reports: ${int(game_state['reports'] * self.config.MONEY_LOSS_PER_REPORT)}",
-            True,
-            self._get_reports_color(game_state['reports'])
+        self._draw_text(
+            'reports_impact',
+            f"Money Loss from Reports: ${int(game_state.reports * self.config.MONEY_LOSS_PER_REPORT)}",
+            self.font,
+            self._get_reports_color(game_state.reports),
+            (50, 200)
         )
-        self.screen.blit(impact_text, (50, 200))
+        
+        # Draw pause / game over status
+        if game_state.game_over:
+            self._draw_text('game_status', "Game Over: the AI went rogue", self.font, self.config.DANGER_COLOR, (50, 250))
+        elif game_state.paused:
+            self._draw_text('game_status', "Paused (P to resume)", self.font, self.config.WARNING_COLOR, (50, 250))
+        else:
+            self._draw_text('game_status', "", self.font, self.config.TEXT_COLOR, (50, 250))
         
         # Draw Railguards button
-        if not game_state['railguards_active']:
-            railguards_color = (0, 200, 255)  # Light blue
-            pygame.draw.rect(self.screen, railguards_color, self.railguards_button)
-            railguards_text = self.font.render(
-                f"Buy Railguards (G) ${self.config.RAILGUARDS_COST}",
-                True,
-                (0, 0, 0)
+        if not game_state.railguards_active:
+            self._draw_button(
+                'railguards',
+                self.railguards_button,
+                (0, 200, 255),  # Light blue
+                f"Buy Railguards (G) ${self.config.RAILGUARDS_COST}"
             )
-            self.screen.blit(railguards_text, (self.railguards_button.x + 10, self.railguards_button.y + 10))
         else:
-            railguards_text = self.font.render(
+            self._draw_text(
+                'railguards',
                 "Railguards Active",
-                True,
-                (0, 200, 255)
+                self.font,
+                (0, 200, 255),
+                (50, 310)
             )
-            self.screen.blit(railguards_text, (50, 310))
         
     def _draw_emergency_actions(self, game_state):
-        emergency_status = game_state['emergency_status']
-        
-        # Draw emergency panel title
-        title = self.title_font.render(
-            "Emergency Actions",
-            True,
-            self.config.TEXT_COLOR
-        )
-        self.screen.blit(title, (50, 350))
+        emergency_status = game_state.emergency_status
         
         # Draw reload button
-        reload_color = (0, 255, 0) if not emergency_status['is_reloading'] else (100, 100, 100)
-        pygame.draw.rect(self.screen, reload_color, self.reload_button)
-        reload_text = self.font.render(
-            "Reload (R)" if not emergency_status['is_reloading'] else f"Reloading... {int(emergency_status['action_progress'] * 100)}%",
-            True,
-            (0, 0, 0)
+        self._draw_button(
+            'reload',
+            self.reload_button,
+            (0, 255, 0) if not emergency_status.is_reloading else (100, 100, 100),
+            "Reload (R)" if not emergency_status.is_reloading else f"Reloading... {int(emergency_status.action_progress * 100)}%"
         )
-        self.screen.blit(reload_text, (self.reload_button.x + 10, self.reload_button.y + 10))
         
         # Draw retrain button
-        retrain_color = (255, 165, 0) if not emergency_status['is_retraining'] else (100, 100, 100)
-        pygame.draw.rect(self.screen, retrain_color, self.retrain_button)
-        retrain_text = self.font.render(
-            "Retrain (T)" if not emergency_status['is_retraining'] else f"Retraining... {int(emergency_status['action_progress'] * 100)}%",
-            True,
-            (0, 0, 0)
+        self._draw_button(
+            'retrain',
+            self.retrain_button,
+            (255, 165, 0) if not emergency_status.is_retraining else (100, 100, 100),
+            "Retrain (T)" if not emergency_status.is_retraining else f"Retraining... {int(emergency_status.action_progress * 100)}%"
         )
-        self.screen.blit(retrain_text, (self.retrain_button.x + 10, self.retrain_button.y + 10))
         
         # Draw shutdown button
-        shutdown_color = (255, 0, 0) if not emergency_status['is_shutdown'] else (100, 100, 100)
-        pygame.draw.rect(self.screen, shutdown_color, self.shutdown_button)
-        shutdown_text = self.font.render(
-            "Shutdown (S)" if not emergency_status['is_shutdown'] else "Restart (S)",
-            True,
-            (0, 0, 0)
+        self._draw_button(
+            'shutdown',
+            self.shutdown_button,
+            (255, 0, 0) if not emergency_status.is_shutdown else (100, 100, 100),
+            "Shutdown (S)" if not emergency_status.is_shutdown else "Restart (S)"
         )
-        self.screen.blit(shutdown_text, (self.shutdown_button.x + 10, self.shutdown_button.y + 10))
         
         # Draw user base status
-        user_text = self.font.render(
-            f"User Base: {int(emergency_status['user_base'] * 100)}%",
-            True,
-            self.config.TEXT_COLOR
-        )
-        self.screen.blit(user_text, (50, 550))
-        
-    def _draw_tool_panel(self, game_state):
-        # Draw tool panel background
-        pygame.draw.rect(
-            self.screen,
-            (30, 30, 30),
-            (
-                self.config.SCREEN_WIDTH - self.tool_panel_width,
-                0,
-                self.tool_panel_width,
-                self.config.SCREEN_HEIGHT
-            )
+        self._draw_text(
+            'user_base',
+            f"User Base: {int(emergency_status.user_base * 100)}%",
+            self.font,
+            self.config.TEXT_COLOR,
+            (50, 550)
         )
         
-        # Draw tool panel title
-        title = self.title_font.render(
-            "Monitoring Tools",
-            True,
-            self.config.TEXT_COLOR
-        )
-        self.screen.blit(
-            title,
-            (self.config.SCREEN_WIDTH - self.tool_panel_width + 10, 60)
+    def _draw_fleet(self, ai_state):
+        # Fleet aggregates, only shown when overseeing more than one AI system
+        self._draw_text(
+            'fleet',
+            f"Fleet: {ai_state.fleet_size} models, {ai_state.rogue_count} rogue, worst alignment {ai_state.min_alignment:.2f}",
+            self.font,
+            self._get_alignment_color(ai_state.min_alignment),
+            (50, 600)
         )
         
+    def _draw_tool_panel(self, game_state):
         # Draw tools
         y_offset = 120
-        for tool_name, tool_status in game_state['tools_status'].items():
-            color = (0, 255, 0) if tool_status['active'] else (255, 0, 0)
-            tool_text = self.font.render(
-                f"{tool_name}: {'Active' if tool_status['active'] else 'Inactive'}",
-                True,
-                color
-            )
-            self.screen.blit(
-                tool_text,
+        for tool_name, tool_status in game_state.tools_status.items():
+            self._draw_text(
+                'tool:' + tool_name,
+                f"{tool_name}: {'Active' if tool_status.active else 'Inactive'}",
+                self.font,
+                (0, 255, 0) if tool_status.active else (255, 0, 0),
                 (self.config.SCREEN_WIDTH - self.tool_panel_width + 10, y_offset)
             )
             y_offset += 30
             
+    def _draw_profiler(self, profiler):
+        if self._profiler_frame is None or profiler.frame_count - self._profiler_frame >= self.PROFILER_REFRESH_FRAMES:
+            self._profiler_frame = profiler.frame_count
+            self._profiler_lines = ["Frame ms   p50 / p95 / p99"] + [
+                f"{name}: {stats['p50']:.2f} / {stats['p95']:.2f} / {stats['p99']:.2f}"
+                for name, stats in profiler.summary().items()
+            ]
+        x = self.config.SCREEN_WIDTH - self.tool_panel_width + 10
+        for i, line in enumerate(self._profiler_lines):
+            self._draw_text(f'profiler:{i}', line, self.small_font, self.config.TEXT_COLOR, (x, 470 + i * 20))
+            
     def _get_risk_color(self, risk_level):
         if risk_level < 0.3:
             return (0, 255, 0)  # Green
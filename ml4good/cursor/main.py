@@ -1,58 +1,161 @@
+import argparse
+import os
+import random
 import pygame
 import sys
 from game.engine import GameEngine
 from game.ui import GameUI
 from game.config import GameConfig
+from game.actions import Action, action_for_key, apply_action
+from game.replay import Replay, ReplayRecorder
+from game.profiler import FrameProfiler
+from game.threaded import ThreadedEngine
+from game import persistence
 
 def main():
+    parser = argparse.ArgumentParser(description="AI Overseer")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--record", default=None, metavar="PATH", help="Record the session to a replay file")
+    parser.add_argument("--replay", default=None, metavar="PATH", help="Watch a recorded replay")
+    parser.add_argument("--start", type=float, default=0.0, help="Game time to start the replay at, in seconds")
+    parser.add_argument("--save", default=None, metavar="PATH", help="Resume from this save file if it exists; F5 and quitting save to it")
+    parser.add_argument("--fleet", type=int, default=None, metavar="N", help="Oversee a fleet of N AI systems")
+    parser.add_argument("--threaded", action="store_true", help="Run the simulation on its own thread")
+    parser.add_argument("--profile-csv", default=None, metavar="PATH", help="Write per-frame section timings to a CSV file on exit")
+    args = parser.parse_args()
+    if args.save and (args.record or args.replay):
+        parser.error("--save cannot be combined with --record or --replay")
+    if args.fleet and (args.save or args.record):
+        parser.error("fleets cannot be saved or recorded")
+
     # Initialize pygame
     pygame.init()
-    
+
     # Load configuration
     config = GameConfig()
-    
+    if args.fleet:
+        config.FLEET_SIZE = args.fleet
+
     # Initialize game components
-    engine = GameEngine(config)
+    replay = None
+    if args.replay:
+        replay = Replay.load(args.replay)
+        config = replay.config
+        seed = replay.seed
+        engine = replay.seek(int(round(args.start / config.TICK_DURATION)))
+        replay_start = (pygame.time.get_ticks() / 1000, engine.tick_count)
+    else:
+        seed = args.seed if args.seed is not None else random.randrange(2**32)
+        if args.save and os.path.exists(args.save):
+            engine = persistence.load(args.save, config)
+        else:
+            engine = GameEngine(config, seed=seed)
+    recorder = ReplayRecorder(engine, seed) if args.record and not replay else None
     ui = GameUI(config)
-    
-    # Main game loop
+    profiler = FrameProfiler()
+
+    # With --threaded the engine lives on the simulation thread and is only touched through commands
+    threaded = None
+    if args.threaded and not replay:
+        threaded = ThreadedEngine(engine, on_update=recorder.capture if recorder else None).start()
+
+    def run_on_engine(command, *command_args):
+        if threaded:
+            threaded.submit(command, *command_args)
+        else:
+            command(engine, *command_args)
+
+    def apply(engine, action):
+        if recorder:
+            recorder.record(action)
+        apply_action(engine, action)
+
+    def toggle_pause(engine):
+        engine.paused = not engine.paused
+
+    def act(action):
+        if not replay:
+            run_on_engine(apply, action)
+
+    # Main game loop. Frames run at config.FPS while the screen changes or input arrives,
+    # drop to config.IDLE_FPS while nothing visible changes, and block on the event queue
+    # while the game is paused or over. Waiting on the queue wakes up instantly on input.
     running = True
-    clock = pygame.time.Clock()
-    
+    pending_events = []
+
     while running:
+        frame_start = pygame.time.get_ticks()
+        profiler.begin_frame()
+        
         # Handle events
-        for event in pygame.event.get():
+        events = pending_events + pygame.event.get()
+        pending_events = []
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
+                elif event.key == pygame.K_F3:
+                    ui.toggle_profiler()
+                elif event.key == pygame.K_p and not replay:
+                    run_on_engine(toggle_pause)
+                elif event.key == pygame.K_F5 and args.save:
+                    run_on_engine(persistence.save, args.save)
                 else:
-                    engine.handle_input(event)
+                    action = action_for_key(event.key, len(engine.tool_manager.tool_names))
+                    if action is not None:
+                        act(action)
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left mouse button
                     action = ui.handle_click(event.pos)
                     if action:
-                        if action == 'reload':
-                            engine.handle_input(pygame.K_r)
-                        elif action == 'retrain':
-                            engine.handle_input(pygame.K_t)
-                        elif action == 'shutdown':
-                            engine.handle_input(pygame.K_s)
-                        elif action == 'railguards':
-                            engine.purchase_railguards()
-        
+                        act(Action[action.upper()])
+        profiler.mark('events')
+
         # Update game state
-        engine.update()
-        
-        # Render game
-        ui.render(engine.get_game_state())
-        
-        # Cap the frame rate
-        clock.tick(60)
-    
+        if threaded:
+            pass
+        elif replay:
+            start_time, start_tick = replay_start
+            elapsed = pygame.time.get_ticks() / 1000 - start_time
+            replay.advance(engine, min(start_tick + int(elapsed / config.TICK_DURATION), replay.final_tick))
+        else:
+            engine.update()
+        if recorder and not threaded:
+            recorder.capture()
+        profiler.mark('update')
+
+        # Render game; only the regions whose contents changed are redrawn
+        game_state = threaded.snapshot() if threaded else engine.get_game_state()
+        profiler.mark('state')
+        dirty_rects = ui.render(game_state, profiler)
+        profiler.mark('render')
+
+        # Wait for the next frame, or for input
+        idle = game_state.paused or game_state.game_over or (replay and engine.tick_count >= replay.final_tick)
+        if idle and not ui.show_profiler:
+            timeout = int(config.IDLE_TIMEOUT * 1000)
+        else:
+            fps = config.FPS if (events or dirty_rects) else config.IDLE_FPS
+            timeout = 1000 // fps - (pygame.time.get_ticks() - frame_start)
+        # A timeout of 0 would block until the next event
+        if timeout > 0:
+            event = pygame.event.wait(timeout)
+            if event.type != pygame.NOEVENT:
+                pending_events.append(event)
+        profiler.mark('wait')
+
+    if threaded:
+        threaded.stop()
+    if recorder:
+        recorder.save(args.record)
+    if args.save:
+        persistence.save(engine, args.save)
+    if args.profile_csv:
+        profiler.export_csv(args.profile_csv)
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,86 @@
+import copy
+import time
+from math import ceil
+
+import torch
+
+#############################################
+#         Micro-Batch Size Autotuner        #
+#############################################
+
+# Results are kept per architecture, device and logical batch size, so a search only probes each configuration once
+_micro_batch_cache = {}
+
+def _probe(model, loss_fn, batch_size, device, num_classes, iters):
+    param = next(model.parameters())
+    inputs = torch.randn(batch_size, 3, 32, 32, device=device, dtype=param.dtype).to(memory_format=torch.channels_last)
+    labels = torch.randint(0, num_classes, (batch_size,), device=device)
+
+    def step():
+        model.zero_grad(set_to_none=True)
+        loss_fn(model(inputs), labels).backward()
+
+    def sync():
+        if device.type == 'cuda':
+            torch.cuda.synchronize()
+
+    if device.type == 'cuda':
+        torch.cuda.reset_peak_memory_stats(device)
+    step()  # warmup
+    sync()
+    start = time.perf_counter()
+    for _ in range(iters):
+        step()
+    sync()
+    throughput = batch_size * iters / (time.perf_counter() - start)
+    peak_memory = torch.cuda.max_memory_allocated(device) if device.type == 'cuda' else 0
+    return throughput, peak_memory
+
+def autotune_micro_batch(model, loss_fn, device, batch_size, min_batch_size=16, memory_fraction=0.8, num_classes=10, iters=3):
+    """Find the physical micro-batch size for training with logical batches of `batch_size`.
+
+    Only CUDA devices are probed; elsewhere there is no memory cap to respect and the full
+    batch is used. On CUDA the full batch is probed first with a forward+backward pass on a
+    copy of `model`, and is used whenever it fits, so gradients are only accumulated when
+    they have to be. A batch fits if it neither runs out of memory nor peaks above
+    `memory_fraction` of the device memory. Otherwise every even split of the batch into 2, 3,
+    ... micro-batches of at least `min_batch_size` is probed, and the one with the highest
+    throughput (images/sec) among those that fit is returned.
+    """
+    device = torch.device(device)
+    if device.type != 'cuda':
+        return batch_size
+    key = (tuple(tuple(p.shape) for p in model.parameters()), next(model.parameters()).dtype, str(device), batch_size)
+    if key in _micro_batch_cache:
+        return _micro_batch_cache[key]
+
+    memory_cap = memory_fraction * torch.cuda.get_device_properties(device).total_memory
+
+    def fits(size):
+        # Throughput of `size`, or None if it does not fit
+        try:
+            throughput, peak_memory = _probe(probe_model, loss_fn, size, device, num_classes, iters)
+        except torch.OutOfMemoryError:
+            return None
+        return throughput if peak_memory <= memory_cap else None
+
+    probe_model = copy.deepcopy(model).to(device).train()
+    micro_batch_size, throughput = batch_size, fits(batch_size)
+    if throughput is None:
+        # Largest micro-batch for each number of even splits, down to min_batch_size
+        min_batch_size = min(min_batch_size, batch_size)
+        candidates = sorted({ceil(batch_size / k) for k in range(2, batch_size // min_batch_size + 1)}, reverse=True)
+        micro_batch_size = candidates[-1] if candidates else batch_size
+        for candidate in candidates:
+            candidate_throughput = fits(candidate)
+            if candidate_throughput is not None and (throughput is None or candidate_throughput > throughput):
+                micro_batch_size, throughput = candidate, candidate_throughput
+
+    del probe_model
+    torch.cuda.empty_cache()
+    if throughput is None:
+        print(f'No micro-batch of {batch_size} fits; using {micro_batch_size}')
+    else:
+        print(f'Autotuned micro-batch size: {micro_batch_size} of {batch_size} ({throughput:.0f} images/s)')
+    _micro_batch_cache[key] = micro_batch_size
+    return micro_batch_size
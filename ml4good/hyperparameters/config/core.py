@@ -12,6 +12,9 @@ DATASET_DIR = PACKAGE_ROOT / "data"
 class TrainConfig(BaseModel):
     """Model configuration class."""
 
+    # Dataset: "cifar10" or the path of a sharded dataset
+    dataset: str
+
     # Training parameters
     batch_size: int
     epochs: int
@@ -20,9 +23,11 @@ class TrainConfig(BaseModel):
     weight_decay: float
     dropout: float
     augmentations: Dict[str, int]
+    divergence_check_steps: int
 
     # Evaluation parameters
     eval_steps: int
+    eval_subset_size: int
 
 class NetworkConfig(BaseModel):
     widths: Dict[str, int]
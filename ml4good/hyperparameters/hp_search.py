@@ -1,26 +1,34 @@
+import argparse
+from functools import partial
+
 import torch
 from torch.optim.lr_scheduler import ExponentialLR
 import wandb
 import optuna
+from optuna.trial import TrialState
 
 from ml4good.hyperparameters.model import make_net93
-from ml4good.hyperparameters.processing.loader import CifarLoader
-from ml4good.hyperparameters.config.core import config, DATASET_DIR
-from ml4good.hyperparameters.train import train
-
-# Initialize wandb for the hyperparameter search
-wandb.init(
-    project="ml4good-hyperparameters",
-    name="hyperparameter-search",
-    config={
-        "search_algorithm": "optuna",
-        "n_trials": 100,
-        "direction": "maximize"
+from ml4good.hyperparameters.processing.shards import make_train_loader, make_eval_loader
+from ml4good.hyperparameters.config.core import config
+from ml4good.hyperparameters.train import train, infer, DivergenceWatchdog, TrainingDiverged
+from ml4good.hyperparameters.autotune import autotune_micro_batch
+from ml4good.hyperparameters.inference.logit_cache import LogitCache
+
+# Ranges of the optimizer hyperparameters as (low, high, log), shared with population-based training
+OPTIMIZER_SEARCH_SPACE = {
+    'learning_rate': (1e-5, 1e1, True),
+    'lr_decay': (0.1, 0.9, False),
+    'weight_decay': (1e-5, 1e-1, True),
+}
+
+def suggest_optimizer_params(trial):
+    return {
+        name: trial.suggest_float(name, low, high, log=log)
+        for name, (low, high, log) in OPTIMIZER_SEARCH_SPACE.items()
     }
-)
 
 # 1. Define an objective function to be maximized.
-def objective(trial):
+def objective(trial, dataset=config.train_config.dataset, logit_cache=None, tta_levels=(0,)):
     # Use CUDA if available, otherwise use CPU
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     print(f"Using device: {device}")
@@ -37,9 +45,10 @@ def objective(trial):
     batchnorm_momentum = trial.suggest_float('batchnorm_momentum', 0.1, 0.9)
     scaling_factor = trial.suggest_float('scaling_factor', 0.1, 2.0)
     batch_size = trial.suggest_int('batch_size', 16, 256)
-    learning_rate = trial.suggest_float('learning_rate', 1e-5, 1e1, log=True)
-    lr_decay = trial.suggest_float('lr_decay', 0.1, 0.9)
-    weight_decay = trial.suggest_float('weight_decay', 1e-5, 1e-1, log=True)
+    optimizer_params = suggest_optimizer_params(trial)
+    learning_rate = optimizer_params['learning_rate']
+    lr_decay = optimizer_params['lr_decay']
+    weight_decay = optimizer_params['weight_decay']
     augmentations = config.train_config.augmentations
 
     # Log trial parameters to wandb
@@ -57,19 +66,23 @@ def objective(trial):
     }
     wandb.log(trial_params)
 
-    model = make_net93(widths, batchnorm_momentum, scaling_factor)
-    train_loader = CifarLoader(
-        DATASET_DIR, 
-        train=True, 
-        batch_size=batch_size, 
+    train_loader = make_train_loader(
+        dataset,
+        batch_size=batch_size,
         aug=augmentations
     )
-    val_loader = CifarLoader(
-        DATASET_DIR, 
-        train=False, 
-        batch_size=batch_size, 
-        aug=augmentations
+    val_loader = make_eval_loader(
+        dataset,
+        batch_size=batch_size,
+        subset_size=config.train_config.eval_subset_size
+    )
+    test_loader = make_eval_loader(
+        dataset,
+        batch_size=batch_size,
+        device=device
     )
+    num_classes = len(train_loader.classes)
+    model = make_net93(widths, batchnorm_momentum, scaling_factor, num_classes)
     
     # Define loss function and optimizer
     loss_fn = torch.nn.CrossEntropyLoss()
@@ -85,36 +98,145 @@ def objective(trial):
     model = model.to(device).half()
     loss_fn = loss_fn.to(device)
 
-    final_val_acc = train(
-        model, 
-        optimizer, 
-        schedulers, 
-        loss_fn, 
-        train_loader, 
-        val_loader, 
-        num_epochs=2,
-        device=device
-    )
+    # batch_size is the logical batch; it is only split into micro-batches when it does not fit
+    micro_batch_size = autotune_micro_batch(model, loss_fn, device, batch_size, num_classes=num_classes)
+
+    # Stop trials whose loss or gradients blow up instead of finishing every epoch
+    watchdog = DivergenceWatchdog(check_every=config.train_config.divergence_check_steps)
+    try:
+        final_val_acc = train(
+            model, 
+            optimizer, 
+            schedulers, 
+            loss_fn, 
+            train_loader, 
+            val_loader, 
+            num_epochs=2,
+            device=device,
+            test_loader=test_loader,
+            micro_batch_size=micro_batch_size,
+            watchdog=watchdog
+        )
+    except TrainingDiverged as e:
+        print(f"Trial {trial.number} diverged: {e}")
+        trial.set_user_attr("status", "diverged")
+        wandb.log({"trial_number": trial.number, "diverged": True, "diverged_at_step": watchdog.steps})
+        raise optuna.TrialPruned(str(e))
     
     # Log trial result to wandb
     wandb.log({
         "trial_number": trial.number,
         "final_val_accuracy": final_val_acc
     })
+
+    # Keep the final test logits so ensembles and TTA levels can be compared offline
+    if logit_cache is not None:
+        # A failing cache write must not fail a trial that finished training
+        try:
+            for tta_level in tta_levels:
+                logit_cache.add(trial.study.study_name, trial.number, infer(model, test_loader, tta_level), tta_level)
+        except (KeyError, OSError) as e:
+            print(f"Could not cache the logits of trial {trial.number}: {e}")
     
     return final_val_acc
 
-# 3. Create a study object and optimize the objective function.
-study = optuna.create_study(direction='maximize')
-study.optimize(objective, n_trials=100)
+def warm_start(study, source_study_name, storage, top_k=10, mode="enqueue"):
+    """Seed `study` with the completed trials of a previous study.
+
+    "enqueue" re-evaluates the top-k configurations of the previous study first, so the
+    new study starts from known good regions. "prior" copies every completed trial into
+    the new study, so the sampler treats the previous results as observations. The copies
+    are tagged with `warm_start_from`, only added once per source study, and never
+    reported as the new study's best trial, since their scores may be stale.
+    """
+    source = optuna.load_study(study_name=source_study_name, storage=storage)
+    completed = source.get_trials(deepcopy=False, states=(TrialState.COMPLETE,))
+    if mode == "prior":
+        # A resumed study (load_if_exists) already holds the copies from its first run
+        if any(t.user_attrs.get("warm_start_from") == source_study_name for t in study.get_trials(deepcopy=False)):
+            return len(completed)
+        study.add_trials([
+            optuna.trial.create_trial(
+                params=trial.params,
+                distributions=trial.distributions,
+                value=trial.value,
+                user_attrs={**trial.user_attrs, "warm_start_from": source_study_name}
+            )
+            for trial in completed
+        ])
+    else:
+        best_trials = sorted(completed, key=lambda t: t.value, reverse=True)[:top_k]
+        for trial in best_trials:
+            study.enqueue_trial(trial.params, skip_if_exists=True)
+    return len(completed)
+
+def best_own_trial(study):
+    """Best completed trial evaluated by this study, ignoring trials copied by a "prior" warm start."""
+    trials = [
+        t for t in study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,))
+        if "warm_start_from" not in t.user_attrs
+    ]
+    return max(trials, key=lambda t: t.value, default=None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Optuna hyperparameter search for make_net93.")
+    parser.add_argument("--n-trials", type=int, default=100)
+    parser.add_argument("--dataset", default=config.train_config.dataset, help="cifar10, or the directory of a sharded dataset")
+    parser.add_argument("--storage", default=None, help="Optuna storage URL, e.g. sqlite:///hp_search.db")
+    parser.add_argument("--study-name", default=None)
+    parser.add_argument("--warm-start-from", default=None, help="Name of a previous study in --storage to seed from")
+    parser.add_argument("--warm-start-mode", default="enqueue", choices=["enqueue", "prior"])
+    parser.add_argument("--warm-start-top-k", type=int, default=10)
+    parser.add_argument("--logit-cache", default=None, help="Directory to store each trial's final test logits in")
+    parser.add_argument("--logit-cache-tta", type=int, nargs="+", default=[0], help="TTA levels to cache logits for")
+    args = parser.parse_args()
+    if args.warm_start_from and not args.storage:
+        parser.error("--warm-start-from needs --storage to load the previous study from")
+
+    # Initialize wandb for the hyperparameter search
+    wandb.init(
+        project="ml4good-hyperparameters",
+        name="hyperparameter-search",
+        config={
+            "search_algorithm": "optuna",
+            "n_trials": args.n_trials,
+            "direction": "maximize",
+            "dataset": args.dataset,
+            "warm_start_from": args.warm_start_from,
+            "warm_start_mode": args.warm_start_mode
+        }
+    )
+
+    # 3. Create a study object and optimize the objective function.
+    study = optuna.create_study(
+        direction='maximize',
+        storage=args.storage,
+        study_name=args.study_name,
+        load_if_exists=True
+    )
+    if args.warm_start_from:
+        n_seeded = warm_start(study, args.warm_start_from, args.storage, args.warm_start_top_k, args.warm_start_mode)
+        print(f"Warm-starting from {n_seeded} completed trials of study '{args.warm_start_from}'")
+    logit_cache = None
+    if args.logit_cache:
+        test_loader = make_eval_loader(args.dataset)
+        logit_cache = LogitCache.for_loader(args.logit_cache, test_loader, len(test_loader.classes))
+    study.optimize(
+        partial(objective, dataset=args.dataset, logit_cache=logit_cache, tta_levels=args.logit_cache_tta),
+        n_trials=args.n_trials
+    )
+
+    # Log best trial results to wandb
+    best_trial = best_own_trial(study)
+    if best_trial is not None:
+        wandb.log({
+            "best_trial_number": best_trial.number,
+            "best_val_accuracy": best_trial.value,
+            "best_params": best_trial.params
+        })
 
-# Log best trial results to wandb
-best_trial = study.best_trial
-wandb.log({
-    "best_trial_number": best_trial.number,
-    "best_val_accuracy": best_trial.value,
-    "best_params": best_trial.params
-})
+    # Finish wandb run
+    wandb.finish()
 
-# Finish wandb run
-wandb.finish()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
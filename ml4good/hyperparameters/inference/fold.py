@@ -0,0 +1,154 @@
+import argparse
+import copy
+import time
+
+import torch
+from torch import nn
+
+from ml4good.hyperparameters.model import Conv, ConvGroup, Mul, load_net93
+from ml4good.hyperparameters.processing.shards import make_eval_loader
+from ml4good.hyperparameters.config.core import config
+from ml4good.hyperparameters.train import evaluate
+
+#############################################
+#           Conv-BatchNorm Folding          #
+#############################################
+
+class FusedConvGroup(nn.Module):
+    """ConvGroup with both BatchNorms folded into the convolutions."""
+
+    def __init__(self, conv1, conv2, pool, activ):
+        super().__init__()
+        self.conv1 = conv1
+        self.pool = pool
+        self.conv2 = conv2
+        self.activ = activ
+
+    def forward(self, x):
+        x = self.conv1(x)
+        x = self.pool(x)
+        x = self.activ(x)
+        x = self.conv2(x)
+        x = self.activ(x)
+        return x
+
+def fold_conv_bn(conv, bn, dtype=None):
+    """Return a copy of `conv` computing bn(conv(x)) with the BatchNorm in eval mode.
+
+    The folding is done in fp32 and the result cast to `dtype` (the conv's own dtype by default).
+    """
+    dtype = dtype or conv.weight.dtype
+    scale = bn.weight.detach().float() / torch.sqrt(bn.running_var.float() + bn.eps)
+    shift = bn.bias.detach().float() - bn.running_mean.float() * scale
+    bias = conv.bias.detach().float() if conv.bias is not None else torch.zeros_like(shift)
+
+    padding = conv.padding
+    if padding == 'same':
+        # Explicit padding is equivalent for the odd kernels used here, and is what quantized convs expect
+        padding = tuple(k // 2 for k in conv.kernel_size)
+
+    fused = Conv(conv.in_channels, conv.out_channels, conv.kernel_size, padding=padding, bias=True)
+    fused.weight.data = (conv.weight.detach().float() * scale.view(-1, 1, 1, 1)).to(dtype)
+    fused.bias.data = (bias * scale + shift).to(dtype)
+    if not (torch.isfinite(fused.weight).all() and torch.isfinite(fused.bias).all()):
+        raise ValueError(f'Folded weights overflow {dtype}, fold with dtype=torch.float32 instead')
+    return fused.to(conv.weight.device)
+
+def fold_linear_scale(linear, mul, dtype=None):
+    dtype = dtype or linear.weight.dtype
+    fused = nn.Linear(linear.in_features, linear.out_features, bias=linear.bias is not None)
+    fused.weight.data = (linear.weight.detach().float() * mul.scale).to(dtype)
+    if linear.bias is not None:
+        fused.bias.data = (linear.bias.detach().float() * mul.scale).to(dtype)
+    return fused.to(linear.weight.device)
+
+def fold_convgroup(group, dtype=None):
+    # norm1 comes after the max-pool. A per-channel affine map commutes with max-pooling only
+    # when its scale is positive, which holds as long as the (frozen) BatchNorm weight is positive.
+    if (group.norm1.weight <= 0).any():
+        raise ValueError('Cannot fold norm1 through the max-pool: BatchNorm weight must be positive')
+    return FusedConvGroup(
+        fold_conv_bn(group.conv1, group.norm1, dtype),
+        fold_conv_bn(group.conv2, group.norm2, dtype),
+        copy.deepcopy(group.pool),
+        copy.deepcopy(group.activ),
+    )
+
+def fold_net93(model, dtype=None):
+    """Inference-only copy of a make_net93 model with BatchNorms folded into the convolutions
+    and the output Mul folded into the final Linear."""
+    layers = []
+    modules = list(model.children())
+    i = 0
+    while i < len(modules):
+        mod = modules[i]
+        if isinstance(mod, ConvGroup):
+            layers.append(fold_convgroup(mod, dtype))
+        elif isinstance(mod, nn.Linear) and i + 1 < len(modules) and isinstance(modules[i+1], Mul):
+            layers.append(fold_linear_scale(mod, modules[i+1], dtype))
+            i += 1
+        else:
+            layers.append(copy.deepcopy(mod) if dtype is None else copy.deepcopy(mod).to(dtype))
+        i += 1
+    net = nn.Sequential(*layers).to(memory_format=torch.channels_last)
+    for p in net.parameters():
+        p.requires_grad = False
+    return net.eval()
+
+#############################################
+#             Export & Benchmark            #
+#############################################
+
+def export_torchscript(model, example_inputs, path):
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(model.eval(), example_inputs))
+    scripted.save(str(path))
+    return scripted
+
+def benchmark(model, inputs, warmup=5, iters=20):
+    """Mean latency in milliseconds of one forward pass over `inputs`."""
+    def sync():
+        if inputs.device.type == 'cuda':
+            torch.cuda.synchronize()
+
+    model.eval()
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(inputs)
+        sync()
+        start = time.perf_counter()
+        for _ in range(iters):
+            model(inputs)
+        sync()
+    return 1000 * (time.perf_counter() - start) / iters
+
+def main():
+    parser = argparse.ArgumentParser(description='Fold BatchNorm into Conv layers and export a TorchScript model.')
+    parser.add_argument('--checkpoint', default='best_model.pth')
+    parser.add_argument('--output', default='best_model_folded.pt')
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--fp32', action='store_true', help='Fold into fp32 weights instead of the checkpoint dtype')
+    parser.add_argument('--tta-level', type=int, default=0)
+    parser.add_argument('--dataset', default=config.train_config.dataset, help='cifar10, or the directory of a sharded dataset')
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    dtype = torch.float32 if args.fp32 else None
+    loader = make_eval_loader(args.dataset, batch_size=args.batch_size, device=device)
+    model = load_net93(args.checkpoint, config.net_config, device, len(loader.classes))
+    folded = fold_net93(model, dtype)
+
+    inputs = loader.proc_images['norm'][:args.batch_size]
+    folded_inputs = inputs.to(dtype or inputs.dtype)
+    scripted = export_torchscript(folded, folded_inputs, args.output)
+
+    print(f'Accuracy (original): {evaluate(model, loader, args.tta_level)}')
+    print(f'Accuracy (folded): {evaluate(scripted, loader, args.tta_level, dtype)}')
+    original_ms = benchmark(model, inputs)
+    folded_ms = benchmark(scripted, folded_inputs)
+    print(f'Latency per batch of {len(inputs)}: original {original_ms:.2f} ms, '
+          f'folded {folded_ms:.2f} ms ({original_ms / folded_ms:.2f}x)')
+    print(f'Saved TorchScript model to {args.output}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+#############################################
+#          Validation Logit Cache           #
+#############################################
+
+# A logit cache is a directory holding `index.json`, `labels.npy` and `logits.f16`: a raw fp16
+# array of shape (entries, num_samples, num_classes) that new entries are appended to. The index
+# maps "<study>/<trial>/<tta_level>" keys to rows and records the checksum of the data they were
+# computed on. Rows are appended before the index is replaced, so bytes past the last indexed row
+# are left over from an interrupted `add` and are dropped when the cache is opened.
+
+INDEX_FILE = 'index.json'
+LOGITS_FILE = 'logits.f16'
+LABELS_FILE = 'labels.npy'
+
+def dataset_checksum(loader):
+    digest = hashlib.sha256()
+    digest.update(loader.images.cpu().contiguous().numpy().tobytes())
+    digest.update(loader.labels.cpu().numpy().tobytes())
+    return digest.hexdigest()
+
+class LogitCache:
+
+    def __init__(self, path, checksum, labels, num_classes=10):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self.index = json.load(f)
+            if self.index['checksum'] != checksum:
+                raise ValueError(f'Logit cache at {path} was computed on different data (checksum mismatch)')
+        else:
+            self.index = {
+                'checksum': checksum,
+                'num_samples': len(labels),
+                'num_classes': num_classes,
+                'entries': {},
+            }
+            np.save(os.path.join(path, LABELS_FILE), np.asarray(labels, dtype=np.int64))
+            self._save_index()
+        logits_path = os.path.join(path, LOGITS_FILE)
+        if os.path.exists(logits_path) and os.path.getsize(logits_path) > len(self) * self._row_bytes:
+            os.truncate(logits_path, len(self) * self._row_bytes)
+        self.labels = np.load(os.path.join(path, LABELS_FILE))
+
+    @classmethod
+    def for_loader(cls, path, loader, num_classes=10):
+        return cls(path, dataset_checksum(loader), loader.labels.cpu().numpy(), num_classes)
+
+    @staticmethod
+    def key(study_name, trial_number, tta_level=0):
+        return f'{study_name}/{trial_number}/{tta_level}'
+
+    @property
+    def _row_bytes(self):
+        return self.index['num_samples'] * self.index['num_classes'] * np.dtype(np.float16).itemsize
+
+    def __contains__(self, key):
+        return key in self.index['entries']
+
+    def __len__(self):
+        return len(self.index['entries'])
+
+    def keys(self):
+        return list(self.index['entries'])
+
+    def add(self, study_name, trial_number, logits, tta_level=0):
+        logits = logits.cpu().numpy().astype(np.float16)
+        assert logits.shape == (self.index['num_samples'], self.index['num_classes']), 'Unexpected logits shape %s' % (logits.shape,)
+        key = self.key(study_name, trial_number, tta_level)
+        if key in self:
+            raise KeyError(f'Logits for {key} are already cached')
+        with open(os.path.join(self.path, LOGITS_FILE), 'ab') as f:
+            row = f.tell() // self._row_bytes
+            f.write(logits.tobytes())
+        self.index['entries'][key] = row
+        self._save_index()
+
+    def array(self):
+        """Memory-mapped (entries, num_samples, num_classes) fp16 array of every cached entry."""
+        shape = (len(self), self.index['num_samples'], self.index['num_classes'])
+        return np.memmap(os.path.join(self.path, LOGITS_FILE), dtype=np.float16, mode='r', shape=shape)
+
+    def get(self, keys):
+        rows = [self.index['entries'][key] for key in keys]
+        return np.asarray(self.array()[rows], dtype=np.float32)
+
+    def accuracy(self, keys):
+        """Accuracy of each cached entry on its own."""
+        return (self.get(keys).argmax(-1) == self.labels).mean(-1)
+
+    def ensemble_accuracy(self, keys):
+        return float((self.get(keys).mean(0).argmax(-1) == self.labels).mean())
+
+    def greedy_ensemble(self, keys=None, max_size=10):
+        """Greedy forward selection (with replacement) of entries maximizing ensemble accuracy."""
+        keys = self.keys() if keys is None else list(keys)
+        logits = self.get(keys)
+        selected = []
+        total = np.zeros(logits.shape[1:], dtype=np.float32)
+        best_accuracy = 0.0
+        for _ in range(max_size):
+            candidates = (total + logits).argmax(-1) == self.labels
+            accuracies = candidates.mean(-1)
+            i = int(accuracies.argmax())
+            if accuracies[i] <= best_accuracy and selected:
+                break
+            best_accuracy = float(accuracies[i])
+            selected.append(keys[i])
+            total += logits[i]
+        return selected, best_accuracy
+
+    def _save_index(self):
+        tmp_path = os.path.join(self.path, INDEX_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, os.path.join(self.path, INDEX_FILE))
@@ -0,0 +1,69 @@
+import argparse
+
+import torch
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+from ml4good.hyperparameters.model import load_net93
+from ml4good.hyperparameters.processing.shards import make_eval_loader
+from ml4good.hyperparameters.config.core import config
+from ml4good.hyperparameters.train import evaluate
+from ml4good.hyperparameters.inference.fold import fold_net93, benchmark, export_torchscript
+
+#############################################
+#        Post-Training Quantization         #
+#############################################
+
+def quantize_net93(model, calib_loader, backend='x86'):
+    """Statically quantize a make_net93 model to INT8 for CPU inference.
+
+    The model is first folded into fp32 (BatchNorm into Conv, Mul into Linear) so that
+    every conv carries its own bias, then observed over `calib_loader` to pick the
+    activation ranges.
+    """
+    folded = fold_net93(model.cpu(), torch.float32)
+    torch.backends.quantized.engine = backend
+    calib_images = calib_loader.proc_images['norm'].cpu().float()
+    prepared = prepare_fx(folded, get_default_qconfig_mapping(backend), example_inputs=(calib_images[:1],))
+    with torch.no_grad():
+        for inputs in calib_images.split(calib_loader.batch_size):
+            prepared(inputs)
+    return convert_fx(prepared).eval()
+
+def main():
+    parser = argparse.ArgumentParser(description='Quantize a trained make_net93 checkpoint to INT8 for CPU inference.')
+    parser.add_argument('--checkpoint', default='best_model.pth')
+    parser.add_argument('--output', default='best_model_int8.pt')
+    parser.add_argument('--calib-size', type=int, default=2000, help='Stratified training images used for calibration')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--backend', default='x86', choices=['x86', 'fbgemm', 'qnnpack'])
+    parser.add_argument('--dataset', default=config.train_config.dataset, help='cifar10, or the directory of a sharded dataset')
+    args = parser.parse_args()
+
+    calib_loader = make_eval_loader(args.dataset, train=True, batch_size=args.batch_size, subset_size=args.calib_size)
+    test_loader = make_eval_loader(args.dataset, batch_size=args.batch_size)
+    model = load_net93(args.checkpoint, config.net_config, device='cpu', num_classes=len(test_loader.classes))
+
+    variants = {
+        'fp32': (fold_net93(model, torch.float32), torch.float32),
+        'bf16': (fold_net93(model, torch.bfloat16), torch.bfloat16),
+        'int8': (quantize_net93(model, calib_loader, args.backend), torch.float32),
+    }
+
+    inputs = test_loader.proc_images['norm'][:args.batch_size]
+    results = {}
+    for name, (net, dtype) in variants.items():
+        accuracy = evaluate(net, test_loader, dtype=dtype)
+        latency_ms = benchmark(net, inputs.to(dtype))
+        results[name] = (accuracy, len(inputs) / latency_ms * 1000)
+
+    fp32_accuracy, fp32_throughput = results['fp32']
+    for name, (accuracy, throughput) in results.items():
+        print(f'{name}: accuracy {accuracy:.4f} (delta {accuracy - fp32_accuracy:+.4f}), '
+              f'{throughput:.0f} images/s ({throughput / fp32_throughput:.2f}x fp32)')
+
+    export_torchscript(variants['int8'][0], inputs[:1].float(), args.output)
+    print(f'Saved INT8 TorchScript model to {args.output}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import torch
+import torchvision.transforms as T
+
+from ml4good.hyperparameters.model import load_net93
+from ml4good.hyperparameters.processing.loader import CIFAR_MEAN, CIFAR_STD
+from ml4good.hyperparameters.config.core import config
+from ml4good.hyperparameters.inference.fold import fold_net93
+from ml4good.hyperparameters.processing.shards import make_eval_loader
+
+#############################################
+#          Dynamic Micro-Batching           #
+#############################################
+
+class BatchingPredictor:
+    """Coalesces small prediction requests into batches for a single model.
+
+    Requests are uint8 images shaped (32, 32, 3) or (N, 32, 32, 3), as stored by CifarLoader;
+    `submit` rejects any other shape with a ValueError, so one bad request cannot fail a batch.
+    A dispatcher thread collects requests until either `max_batch_size` images are queued or
+    the oldest request has waited `max_latency_ms`, then hands the batch to a worker pool.
+    """
+
+    def __init__(self, model, max_batch_size=256, max_latency_ms=5.0, num_workers=2, device="cpu", dtype=torch.float32, history=10000, normalize=None):
+        self.model = model.to(device).eval()
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.device = device
+        self.dtype = dtype
+        self.normalize = normalize or T.Normalize(CIFAR_MEAN, CIFAR_STD)
+
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(num_workers)
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=history)
+        self._batch_sizes = deque(maxlen=history)
+        self._num_images = 0
+        self._num_requests = 0
+        self._start_time = time.perf_counter()
+        self._running = True
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, images):
+        """Queue `images` for prediction and return a Future resolving to their logits."""
+        images = torch.as_tensor(images, dtype=torch.uint8)
+        if images.dim() not in (3, 4) or images.shape[-3:] != (32, 32, 3):
+            raise ValueError(f'expected images shaped (32, 32, 3) or (N, 32, 32, 3), got {tuple(images.shape)}')
+        if images.dim() == 3:
+            images = images.unsqueeze(0)
+        future = Future()
+        self._queue.put((images, future, time.perf_counter()))
+        return future
+
+    def predict(self, images, timeout=None):
+        return self.submit(images).result(timeout)
+
+    def close(self):
+        self._running = False
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._stats_lock:
+            latencies = torch.tensor(self._latencies, dtype=torch.float64)
+            batch_sizes = list(self._batch_sizes)
+            num_images = self._num_images
+            num_requests = self._num_requests
+        elapsed = time.perf_counter() - self._start_time
+        stats = {
+            'requests': num_requests,
+            'images': num_images,
+            'throughput': num_images / elapsed,
+            'mean_batch_size': sum(batch_sizes) / len(batch_sizes) if batch_sizes else 0.0,
+        }
+        for q in (50, 95, 99):
+            stats[f'p{q}_ms'] = 1000 * latencies.quantile(q / 100).item() if len(latencies) else 0.0
+        return stats
+
+    def _dispatch(self):
+        while self._running:
+            request = self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+            num_images = len(request[0])
+            deadline = request[2] + self.max_latency
+            while num_images < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._running = False
+                    break
+                batch.append(request)
+                num_images += len(request[0])
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        try:
+            images = torch.cat([images for images, _, _ in batch]).to(self.device)
+            # Same preprocessing as CifarLoader, in the serving dtype
+            images = self.normalize((images.to(self.dtype) / 255).permute(0, 3, 1, 2))
+            images = images.contiguous(memory_format=torch.channels_last)
+            with torch.no_grad():
+                logits = self.model(images).float().cpu()
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        done = time.perf_counter()
+        outputs = logits.split([len(images) for images, _, _ in batch])
+        with self._stats_lock:
+            self._batch_sizes.append(len(logits))
+            self._num_images += len(logits)
+            self._num_requests += len(batch)
+            self._latencies.extend(done - start for _, _, start in batch)
+        for (_, future, _), output in zip(batch, outputs):
+            future.set_result(output)
+
+#############################################
+#                HTTP Server                #
+#############################################
+
+def make_handler(predictor):
+
+    class PredictHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path != '/stats':
+                return self.send_error(404)
+            self._send_json(predictor.stats())
+
+        def do_POST(self):
+            if self.path != '/predict':
+                return self.send_error(404)
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                if self.headers.get('Content-Type') == 'application/octet-stream':
+                    images = torch.frombuffer(bytearray(body), dtype=torch.uint8).view(-1, 32, 32, 3)
+                else:
+                    images = json.loads(body)['images']
+                # Malformed requests are rejected here, before they can join a batch
+                future = predictor.submit(images)
+            except (ValueError, KeyError, TypeError, RuntimeError) as e:
+                return self.send_error(400, str(e))
+            try:
+                logits = future.result()
+            except RuntimeError as e:
+                return self.send_error(500, str(e))
+            self._send_json({
+                'predictions': logits.argmax(1).tolist(),
+                'logits': logits.tolist(),
+            })
+
+        def _send_json(self, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return PredictHandler
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a trained make_net93 checkpoint with dynamic micro-batching.')
+    parser.add_argument('--checkpoint', default='best_model.pth')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-latency-ms', type=float, default=5.0)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--dataset', default=config.train_config.dataset, help='cifar10, or the directory of a sharded dataset')
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    # fp16 runs poorly on CPUs, so serve an fp32 fold there
+    dtype = torch.float16 if device == "cuda" else torch.float32
+    # The dataset's test split gives the class count and normalization the model was trained with
+    loader = make_eval_loader(args.dataset)
+    model = fold_net93(load_net93(args.checkpoint, config.net_config, device, len(loader.classes)), dtype)
+    predictor = BatchingPredictor(
+        model,
+        max_batch_size=args.max_batch_size,
+        max_latency_ms=args.max_latency_ms,
+        num_workers=args.workers,
+        device=device,
+        dtype=dtype,
+        normalize=loader.normalize
+    )
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(predictor))
+    print(f'Serving on http://{args.host}:{args.port} (POST /predict, GET /stats)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        predictor.close()
+        print(json.dumps(predictor.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -58,7 +58,7 @@ class ConvGroup(nn.Module):
 #            Network Definition             #
 #############################################
 
-def make_net93(widths, batchnorm_momentum, scaling_factor):
+def make_net93(widths, batchnorm_momentum, scaling_factor, num_classes=10):
     whiten_kernel_size = 2
     whiten_width = 2 * 3 * whiten_kernel_size**2
     net = nn.Sequential(
@@ -69,7 +69,7 @@ def make_net93(widths, batchnorm_momentum, scaling_factor):
         ConvGroup(widths['block2'], widths['block3'], batchnorm_momentum),
         nn.MaxPool2d(3),
         Flatten(),
-        nn.Linear(widths['block3'], 10, bias=False),
+        nn.Linear(widths['block3'], num_classes, bias=False),
         Mul(scaling_factor),
     )
     net[0].weight.requires_grad = False
@@ -79,3 +79,8 @@ def make_net93(widths, batchnorm_momentum, scaling_factor):
         if isinstance(mod, BatchNorm):
             mod.float()
     return net
+
+def load_net93(path, net_config, device="cpu", num_classes=10):
+    model = make_net93(net_config.widths, net_config.batchnorm_momentum, net_config.scaling_factor, num_classes)
+    model.load_state_dict(torch.load(path, map_location=device))
+    return model.to(device).eval()
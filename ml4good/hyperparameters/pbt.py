@@ -0,0 +1,158 @@
+import argparse
+import random
+
+import torch
+from torch.optim.lr_scheduler import ExponentialLR
+import wandb
+import optuna
+from optuna.trial import TrialState
+
+from ml4good.hyperparameters.model import make_net93
+from ml4good.hyperparameters.processing.shards import make_train_loader, make_eval_loader
+from ml4good.hyperparameters.config.core import config
+from ml4good.hyperparameters.train import train_epoch, validate, DivergenceWatchdog, TrainingDiverged
+from ml4good.hyperparameters.hp_search import OPTIMIZER_SEARCH_SPACE, suggest_optimizer_params
+
+#############################################
+#        Population-Based Training          #
+#############################################
+
+class Member:
+    """One model of the population, together with the Optuna trial it reports to."""
+
+    def __init__(self, trial, net_config, params, device, num_classes=10):
+        self.trial = trial
+        self.params = dict(params)
+        self.model = make_net93(net_config.widths, net_config.batchnorm_momentum, net_config.scaling_factor, num_classes).to(device).half()
+        self.optimizer = torch.optim.SGD(
+            self.model.parameters(),
+            lr=params['learning_rate'],
+            weight_decay=params['weight_decay']
+        )
+        self.scheduler = ExponentialLR(self.optimizer, gamma=(1-params['lr_decay']))
+        self.score = 0.0
+        self.diverged = False
+        self.watchdog = DivergenceWatchdog(check_every=config.train_config.divergence_check_steps)
+        self.history = []
+
+    def copy_from(self, other):
+        self.model.load_state_dict(other.model.state_dict())
+        self.optimizer.load_state_dict(other.optimizer.state_dict())
+        self.scheduler.load_state_dict(other.scheduler.state_dict())
+        self.params = dict(other.params)
+        self.diverged = False
+        self.watchdog = DivergenceWatchdog(check_every=config.train_config.divergence_check_steps)
+
+    def perturb(self, factors=(0.8, 1.2)):
+        # The learning rate is perturbed around its current, already decayed, value
+        self.params['learning_rate'] = self.optimizer.param_groups[0]['lr']
+        for name, (low, high, _) in OPTIMIZER_SEARCH_SPACE.items():
+            self.params[name] = min(max(self.params[name] * random.choice(factors), low), high)
+        for group in self.optimizer.param_groups:
+            group['lr'] = self.params['learning_rate']
+            group['weight_decay'] = self.params['weight_decay']
+        self.scheduler.gamma = 1 - self.params['lr_decay']
+
+def exploit_and_explore(population, fraction=0.25):
+    """Replace the bottom `fraction` of the population by perturbed copies of the top `fraction`."""
+    assert 0 < fraction <= 0.5, 'fraction must be in (0, 0.5] so the top and bottom of the population do not overlap'
+    ranked = sorted(population, key=lambda m: m.score, reverse=True)
+    n = min(max(1, int(len(ranked) * fraction)), len(ranked) // 2)
+    if n == 0:
+        return
+    for member in ranked[-n:]:
+        source = random.choice(ranked[:n])
+        member.copy_from(source)
+        member.perturb()
+        member.history.append({'copied_from': source.trial.number, **member.params})
+
+def run_pbt(study, population_size=8, num_epochs=10, ready_interval=2, fraction=0.25, device="cpu", dataset=config.train_config.dataset):
+    train_config = config.train_config
+    train_loader = make_train_loader(dataset, train_config.batch_size, aug=train_config.augmentations)
+    val_loader = make_eval_loader(dataset, batch_size=train_config.batch_size, subset_size=train_config.eval_subset_size)
+    test_loader = make_eval_loader(dataset, batch_size=train_config.batch_size)
+    loss_fn = torch.nn.CrossEntropyLoss().to(device)
+
+    population = []
+    for _ in range(population_size):
+        trial = study.ask()
+        population.append(Member(trial, config.net_config, suggest_optimizer_params(trial), device, len(train_loader.classes)))
+
+    for epoch in range(num_epochs):
+        for member in population:
+            # Diverged members stop training and rank last until they are replaced
+            if member.diverged:
+                continue
+            try:
+                running_loss, correct, total = train_epoch(member.model, member.optimizer, loss_fn, train_loader, device, watchdog=member.watchdog)
+            except TrainingDiverged as e:
+                print(f"Trial {member.trial.number} diverged: {e}")
+                member.diverged, member.score = True, 0.0
+                continue
+            member.scheduler.step()
+            _, member.score = validate(member.model, loss_fn, val_loader, device)
+            wandb.log({
+                "epoch": epoch,
+                "trial_number": member.trial.number,
+                "train_loss": running_loss / len(train_loader),
+                "train_accuracy": 100 * correct / total,
+                "val_accuracy": member.score,
+                "learning_rate": member.optimizer.param_groups[0]["lr"]
+            })
+        print(f'Epoch {epoch + 1}/{num_epochs}, population validation accuracy: {sorted(m.score for m in population)}')
+
+        if (epoch + 1) % ready_interval == 0 and epoch + 1 < num_epochs:
+            exploit_and_explore(population, fraction)
+
+    for member in population:
+        member.trial.set_user_attr('pbt_final_params', member.params)
+        member.trial.set_user_attr('pbt_history', member.history)
+        if member.diverged:
+            member.trial.set_user_attr('status', 'diverged')
+            study.tell(member.trial, state=TrialState.PRUNED)
+            continue
+        # The final score uses the full test set, like the final score of a regular trial
+        _, member.score = validate(member.model, loss_fn, test_loader, device)
+        study.tell(member.trial, member.score)
+    return max(population, key=lambda m: m.score)
+
+def main():
+    parser = argparse.ArgumentParser(description="Population-based training over the make_net93 optimizer hyperparameters.")
+    parser.add_argument("--population", type=int, default=8)
+    parser.add_argument("--dataset", default=config.train_config.dataset, help="cifar10, or the directory of a sharded dataset")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--ready-interval", type=int, default=2, help="Epochs between exploit/explore steps")
+    parser.add_argument("--fraction", type=float, default=0.25, help="Fraction of the population replaced at each step")
+    parser.add_argument("--storage", default=None, help="Optuna storage URL, e.g. sqlite:///hp_search.db")
+    parser.add_argument("--study-name", default=None)
+    args = parser.parse_args()
+    if not 0 < args.fraction <= 0.5:
+        parser.error("--fraction must be in (0, 0.5]")
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print(f"Using device: {device}")
+
+    wandb.init(
+        project="ml4good-hyperparameters",
+        name="population-based-training",
+        config=vars(args)
+    )
+
+    study = optuna.create_study(
+        direction='maximize',
+        storage=args.storage,
+        study_name=args.study_name,
+        load_if_exists=True
+    )
+    best = run_pbt(study, args.population, args.epochs, args.ready_interval, args.fraction, device, args.dataset)
+    torch.save(best.model.state_dict(), 'best_model.pth')
+
+    wandb.log({
+        "best_trial_number": best.trial.number,
+        "best_test_accuracy": best.score,
+        "best_params": best.params
+    })
+    wandb.finish()
+
+if __name__ == "__main__":
+    main()
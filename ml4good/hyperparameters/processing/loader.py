@@ -62,17 +62,32 @@ def batch_cutout(inputs, size):
     cutout_masks = make_random_square_masks(inputs, size)
     return inputs.masked_fill(cutout_masks, 0)
 
+def load_cifar(path, train=True, device="cpu"):
+    data_path = os.path.join(path, 'train.pt' if train else 'test.pt')
+    if not os.path.exists(data_path):
+        dset = torchvision.datasets.CIFAR10(path, download=True, train=train)
+        images = torch.tensor(dset.data)
+        labels = torch.tensor(dset.targets)
+        torch.save({'images': images, 'labels': labels, 'classes': dset.classes}, data_path)
+    return torch.load(data_path, map_location=device)
+
+def stratified_subset(labels, size, seed=0):
+    """Indices of a class-balanced subset of `size` samples, fixed for a given seed."""
+    classes = labels.unique()
+    per_class = size // len(classes)
+    generator = torch.Generator().manual_seed(seed)
+    indices = []
+    for c in classes:
+        class_idxs = (labels == c).nonzero().flatten().cpu()
+        perm = torch.randperm(len(class_idxs), generator=generator)
+        indices.append(class_idxs[perm[:per_class]])
+    return torch.cat(indices).sort().values.to(labels.device)
+
 class CifarLoader:
 
     def __init__(self, path, train=True, batch_size=500, aug=None, drop_last=None, shuffle=None, altflip=False, device="cpu"):
 
-        data_path = os.path.join(path, 'train.pt' if train else 'test.pt')
-        if not os.path.exists(data_path):
-            dset = torchvision.datasets.CIFAR10(path, download=True, train=train)
-            images = torch.tensor(dset.data)
-            labels = torch.tensor(dset.targets)
-            torch.save({'images': images, 'labels': labels, 'classes': dset.classes}, data_path)
-        data = torch.load(data_path, map_location=device)
+        data = load_cifar(path, train, device)
 
         self.epoch = 0
         self.images, self.labels, self.classes = data['images'], data['labels'], data['classes']
@@ -134,3 +149,24 @@ class CifarLoader:
             idxs = indices[i*self.batch_size:(i+1)*self.batch_size]
             yield (images[idxs], self.labels[idxs])
 
+
+class CifarEvalLoader(CifarLoader):
+    """Augmentation-free loader for validation and test splits.
+
+    Images are normalized once at construction and the result is reused on every
+    pass. If `subset_size` is given, only a class-balanced subset of the split is
+    kept, which makes intermediate evaluations during a search much cheaper.
+    """
+
+    def __init__(self, path, train=False, batch_size=500, subset_size=None, subset_seed=0, device="cpu"):
+        super().__init__(path, train=train, batch_size=batch_size, aug=None, drop_last=False, shuffle=False, device=device)
+        if subset_size:
+            idxs = stratified_subset(self.labels, subset_size, subset_seed)
+            self.images, self.labels = self.images[idxs], self.labels[idxs]
+        self.proc_images['norm'] = self.normalize(self.images)
+
+    def __iter__(self):
+        images = self.proc_images['norm']
+        self.epoch += 1
+        for i in range(len(self)):
+            yield (images[i*self.batch_size:(i+1)*self.batch_size], self.labels[i*self.batch_size:(i+1)*self.batch_size])
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+from math import ceil
+
+import torch
+import torch.nn.functional as F
+import torchvision
+import torchvision.transforms as T
+
+from ml4good.hyperparameters.processing.loader import CifarLoader, CifarEvalLoader, batch_flip_lr, batch_crop, batch_cutout, stratified_subset
+from ml4good.hyperparameters.config.core import DATASET_DIR
+
+#############################################
+#            Sharded Dataset Format         #
+#############################################
+
+# A sharded dataset is a directory holding `index.json` and a sequence of `shard_XXXXX.pt`
+# files. Each shard stores uint8 images (N, H, W, C) and int64 labels; the index records
+# the shard sizes, class names and per-channel mean/std used for normalization.
+
+INDEX_FILE = 'index.json'
+
+class ShardWriter:
+    """Writes image/label chunks of any size into fixed-size shards, holding at most one shard in memory."""
+
+    def __init__(self, out_dir, classes, shard_size=10000):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.classes = list(classes)
+        self.shard_size = shard_size
+        self.shards = []
+        self._images, self._labels = [], []
+        self._buffered = 0
+        self._sum = None
+        self._sq_sum = None
+        self._pixels = 0
+
+    def add(self, images, labels):
+        images, labels = torch.as_tensor(images, dtype=torch.uint8), torch.as_tensor(labels, dtype=torch.int64)
+        self._images.append(images)
+        self._labels.append(labels)
+        self._buffered += len(images)
+
+        pixels = images.reshape(-1, images.shape[-1]).double() / 255
+        self._sum = pixels.sum(0) + (self._sum if self._sum is not None else 0)
+        self._sq_sum = (pixels**2).sum(0) + (self._sq_sum if self._sq_sum is not None else 0)
+        self._pixels += len(pixels)
+
+        while self._buffered >= self.shard_size:
+            self._flush(self.shard_size)
+
+    def close(self):
+        if not self._pixels:
+            raise ValueError(f'No samples were written to {self.out_dir}')
+        if self._buffered:
+            self._flush(self._buffered)
+        mean = self._sum / self._pixels
+        std = (self._sq_sum / self._pixels - mean**2).sqrt()
+        index = {
+            'classes': self.classes,
+            'num_samples': sum(shard['num_samples'] for shard in self.shards),
+            'mean': mean.tolist(),
+            'std': std.tolist(),
+            'shards': self.shards,
+        }
+        with open(os.path.join(self.out_dir, INDEX_FILE), 'w') as f:
+            json.dump(index, f, indent=2)
+        return index
+
+    def _flush(self, n):
+        images, labels = torch.cat(self._images), torch.cat(self._labels)
+        name = 'shard_%05d.pt' % len(self.shards)
+        torch.save({'images': images[:n].clone(), 'labels': labels[:n].clone()}, os.path.join(self.out_dir, name))
+        self.shards.append({'file': name, 'num_samples': n})
+        self._images, self._labels = [images[n:]], [labels[n:]]
+        self._buffered -= n
+
+def shard_torchvision(name, path, out_dir, train=True, shard_size=10000):
+    """Convert a torchvision CIFAR-style dataset ('cifar10' or 'cifar100') into shards."""
+    dataset_cls = {'cifar10': torchvision.datasets.CIFAR10, 'cifar100': torchvision.datasets.CIFAR100}[name]
+    dset = dataset_cls(path, download=True, train=train)
+    writer = ShardWriter(out_dir, dset.classes, shard_size)
+    for i in range(0, len(dset.data), shard_size):
+        writer.add(dset.data[i:i+shard_size], dset.targets[i:i+shard_size])
+    return writer.close()
+
+#############################################
+#              Streaming Loader             #
+#############################################
+
+class ShardedLoader:
+    """Streams a sharded dataset with the same batch augmentations as CifarLoader.
+
+    Shards are read one at a time (in random order when shuffling) into a rolling buffer of
+    `buffer_size` images, which is shuffled before batches are drawn from it, so memory use is
+    bounded by `buffer_size` plus one shard regardless of the dataset size.
+    """
+
+    def __init__(self, path, train=True, batch_size=500, aug=None, drop_last=None, shuffle=None, buffer_size=20000, device="cpu"):
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.path = path
+        self.classes = self.index['classes']
+        self.normalize = T.Normalize(self.index['mean'], self.index['std'])
+
+        self.aug = aug or {}
+        for k in self.aug.keys():
+            assert k in ['flip', 'translate', 'cutout'], 'Unrecognized key: %s' % k
+
+        self.batch_size = batch_size
+        self.drop_last = train if drop_last is None else drop_last
+        self.shuffle = train if shuffle is None else shuffle
+        self.buffer_size = buffer_size
+        self.device = device
+        self.epoch = 0
+
+    def __len__(self):
+        n = self.index['num_samples']
+        return n//self.batch_size if self.drop_last else ceil(n/self.batch_size)
+
+    def _read_shards(self):
+        shards = self.index['shards']
+        order = torch.randperm(len(shards)).tolist() if self.shuffle else range(len(shards))
+        for i in order:
+            data = torch.load(os.path.join(self.path, shards[i]['file']))
+            yield data['images'], data['labels']
+
+    def _process(self, images):
+        images = (images.to(self.device).half() / 255).permute(0, 3, 1, 2).to(memory_format=torch.channels_last)
+        images = self.normalize(images)
+        if self.aug.get('flip', False):
+            images = batch_flip_lr(images)
+        pad = self.aug.get('translate', 0)
+        if pad > 0:
+            images = batch_crop(F.pad(images, (pad,)*4, 'reflect'), images.shape[-2])
+        if self.aug.get('cutout', 0) > 0:
+            images = batch_cutout(images, self.aug['cutout'])
+        return images
+
+    def __iter__(self):
+        self.epoch += 1
+        buf_images = buf_labels = None
+        emitted = 0
+        for images, labels in self._read_shards():
+            if buf_images is not None:
+                images, labels = torch.cat([buf_images, images]), torch.cat([buf_labels, labels])
+            if self.shuffle:
+                perm = torch.randperm(len(images))
+                images, labels = images[perm], labels[perm]
+            # Keep `buffer_size` images back to mix with the next shard
+            n_ready = max(len(images) - self.buffer_size, 0) // self.batch_size * self.batch_size
+            for i in range(0, n_ready, self.batch_size):
+                yield (self._process(images[i:i+self.batch_size]), labels[i:i+self.batch_size].to(self.device))
+                emitted += 1
+            buf_images, buf_labels = images[n_ready:], labels[n_ready:]
+
+        if buf_images is None:
+            return
+        for i in range(0, len(buf_images), self.batch_size):
+            if emitted == len(self):
+                break
+            yield (self._process(buf_images[i:i+self.batch_size]), buf_labels[i:i+self.batch_size].to(self.device))
+            emitted += 1
+
+class ShardedEvalLoader:
+    """Augmentation-free loader for one split of a sharded dataset, like CifarEvalLoader.
+
+    Evaluation splits are small, so every shard is read once and kept in memory with the
+    same `images`, `labels` and `proc_images['norm']` attributes as CifarEvalLoader, which
+    `infer` and `evaluate` read directly.
+    """
+
+    def __init__(self, path, batch_size=500, subset_size=None, subset_seed=0, device="cpu"):
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.classes = self.index['classes']
+        self.normalize = T.Normalize(self.index['mean'], self.index['std'])
+
+        shards = [torch.load(os.path.join(path, shard['file']), map_location=device) for shard in self.index['shards']]
+        self.images = torch.cat([shard['images'] for shard in shards])
+        self.labels = torch.cat([shard['labels'] for shard in shards])
+        if subset_size:
+            idxs = stratified_subset(self.labels, subset_size, subset_seed)
+            self.images, self.labels = self.images[idxs], self.labels[idxs]
+        self.images = (self.images.half() / 255).permute(0, 3, 1, 2).to(memory_format=torch.channels_last)
+        self.proc_images = {'norm': self.normalize(self.images)}
+
+        self.aug = {}
+        self.batch_size = batch_size
+        self.drop_last = False
+        self.shuffle = False
+        self.epoch = 0
+
+    def __len__(self):
+        return ceil(len(self.images)/self.batch_size)
+
+    def __iter__(self):
+        images = self.proc_images['norm']
+        self.epoch += 1
+        for i in range(len(self)):
+            yield (images[i*self.batch_size:(i+1)*self.batch_size], self.labels[i*self.batch_size:(i+1)*self.batch_size])
+
+#############################################
+#              Dataset Selection            #
+#############################################
+
+# `dataset` is either 'cifar10', the dataset CifarLoader downloads into DATASET_DIR, or the
+# directory of a sharded dataset written by `main` below, with `train` and `test` splits.
+
+def make_train_loader(dataset, batch_size, aug=None, device="cpu"):
+    if dataset == 'cifar10':
+        return CifarLoader(DATASET_DIR, train=True, batch_size=batch_size, aug=aug, device=device)
+    return ShardedLoader(os.path.join(dataset, 'train'), train=True, batch_size=batch_size, aug=aug, device=device)
+
+def make_eval_loader(dataset, train=False, batch_size=500, subset_size=None, device="cpu"):
+    if dataset == 'cifar10':
+        return CifarEvalLoader(DATASET_DIR, train=train, batch_size=batch_size, subset_size=subset_size, device=device)
+    split = 'train' if train else 'test'
+    return ShardedEvalLoader(os.path.join(dataset, split), batch_size=batch_size, subset_size=subset_size, device=device)
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a torchvision dataset into the sharded on-disk format.')
+    parser.add_argument('--dataset', default='cifar10', choices=['cifar10', 'cifar100'])
+    parser.add_argument('--download-dir', required=True)
+    parser.add_argument('--out-dir', required=True)
+    parser.add_argument('--shard-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    for train in (True, False):
+        out_dir = os.path.join(args.out_dir, 'train' if train else 'test')
+        index = shard_torchvision(args.dataset, args.download_dir, out_dir, train, args.shard_size)
+        print(f"Wrote {index['num_samples']} samples in {len(index['shards'])} shards to {out_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
+import argparse
+
 import torch
 import torch.nn.functional as F
 from torch.optim.lr_scheduler import ExponentialLR
 import wandb
 
-from ml4good.hyperparameters.processing.loader import CifarLoader
+from ml4good.hyperparameters.processing.shards import make_train_loader, make_eval_loader
 from ml4good.hyperparameters.model import make_net93
-from ml4good.hyperparameters.config.core import config, DATASET_DIR
+from ml4good.hyperparameters.config.core import config
+from ml4good.hyperparameters.autotune import autotune_micro_batch
 
-def infer(model, loader, tta_level=0):
+def infer(model, loader, tta_level=0, dtype=None):
     
     def infer_basic(inputs, net):
         return net(inputs).clone()
@@ -29,39 +32,112 @@ def infer(model, loader, tta_level=0):
         return 0.5 * logits + 0.5 * logits_translate
 
     model.eval()
-    test_images = loader.normalize(loader.images)
+    test_images = loader.proc_images.get('norm')
+    if test_images is None:
+        test_images = loader.normalize(loader.images)
+    if dtype is not None:
+        test_images = test_images.to(dtype)
     infer_fn = [infer_basic, infer_mirror, infer_mirror_translate][tta_level]
     with torch.no_grad():
         return torch.cat([infer_fn(inputs, model) for inputs in test_images.split(2000)])
 
-def evaluate(model, loader, tta_level=0):
-    logits = infer(model, loader, tta_level)
+def evaluate(model, loader, tta_level=0, dtype=None):
+    logits = infer(model, loader, tta_level, dtype)
     return (logits.argmax(1) == loader.labels).float().mean().item()
 
-def train(model, optim, schedulers, loss_fn, train_loader, val_loader, num_epochs, device):
-    losses = []
-    best_val_accuracy = 0
-    for epoch in range(num_epochs):
-        model.train()
-        running_loss = 0.0
-        correct = 0
-        total = 0
+def validate(model, loss_fn, loader, device):
+    model.eval()
+    val_loss = 0.0
+    val_correct = 0
+    val_total = 0
 
-        for inputs, labels in train_loader:
+    with torch.no_grad():
+        for inputs, labels in loader:
             # Move data to device
             inputs = inputs.to(device)
             labels = labels.to(device)
             
-            optim.zero_grad()
             outputs = model(inputs)
             loss = loss_fn(outputs, labels)
+
+            val_loss += loss.item()
+            predicted = F.softmax(outputs, dim=1).argmax(dim=1) 
+            val_total += labels.size(0)
+            val_correct += predicted.eq(labels).sum().item()
+
+    return val_loss / len(loader), 100 * val_correct / val_total
+
+class TrainingDiverged(Exception):
+    pass
+
+class DivergenceWatchdog:
+    """Detects diverging training without a host sync on every step.
+
+    Each step folds a "loss or gradient norm is non-finite or too large" flag into an
+    on-device tensor, which is only read back every `check_every` steps.
+    """
+
+    def __init__(self, check_every=10, max_loss=1e3, max_grad_norm=1e4):
+        self.check_every = check_every
+        self.max_loss = max_loss
+        self.max_grad_norm = max_grad_norm
+        self.steps = 0
+        self._diverged = None
+
+    def observe(self, loss, parameters):
+        grads = [p.grad for p in parameters if p.grad is not None]
+        grad_norm = torch.nn.utils.get_total_norm(grads).float()
+        loss = loss.detach().float()
+        diverged = ~torch.isfinite(loss) | (loss > self.max_loss) | ~torch.isfinite(grad_norm) | (grad_norm > self.max_grad_norm)
+        self._diverged = diverged if self._diverged is None else self._diverged | diverged
+        self.steps += 1
+        if self.steps % self.check_every == 0:
+            self.check()
+
+    def check(self):
+        if self._diverged is not None and self._diverged.item():
+            raise TrainingDiverged(f'Training diverged within the last {self.check_every} steps (step {self.steps})')
+        self._diverged = None
+
+def train_epoch(model, optim, loss_fn, train_loader, device, micro_batch_size=None, watchdog=None):
+    model.train()
+    # Running metrics stay on device so the loop never waits on the host
+    running_loss = torch.zeros((), device=device)
+    correct = torch.zeros((), dtype=torch.int64, device=device)
+    total = 0
+
+    for inputs, labels in train_loader:
+        # Move data to device
+        inputs = inputs.to(device)
+        labels = labels.to(device)
+        
+        optim.zero_grad()
+        batch_loss = torch.zeros((), device=device)
+        # Accumulate gradients over physical micro-batches of the logical batch
+        split_size = micro_batch_size or len(labels)
+        for micro_inputs, micro_labels in zip(inputs.split(split_size), labels.split(split_size)):
+            outputs = model(micro_inputs)
+            loss = loss_fn(outputs, micro_labels) * (len(micro_labels) / len(labels))
             loss.backward()
-            optim.step()
 
-            running_loss += loss.item()
+            batch_loss += loss.detach().float()
             predicted = F.softmax(outputs, dim=1).argmax(dim=1)
-            total += labels.size(0)
-            correct += predicted.eq(labels).sum().item()
+            total += micro_labels.size(0)
+            correct += predicted.eq(micro_labels).sum()
+        if watchdog is not None:
+            watchdog.observe(batch_loss, model.parameters())
+        optim.step()
+        running_loss += batch_loss
+
+    if watchdog is not None:
+        watchdog.check()
+    return running_loss.item(), correct.item(), total
+
+def train(model, optim, schedulers, loss_fn, train_loader, val_loader, num_epochs, device, test_loader=None, micro_batch_size=None, watchdog=None):
+    losses = []
+    best_val_accuracy = 0
+    for epoch in range(num_epochs):
+        running_loss, correct, total = train_epoch(model, optim, loss_fn, train_loader, device, micro_batch_size, watchdog)
 
         losses.append(running_loss)
         for scheduler in schedulers:
@@ -75,27 +151,7 @@ def train(model, optim, schedulers, loss_fn, train_loader, val_loader, num_epoch
         print(f'Epoch {epoch + 1}/{num_epochs}, Loss: {train_loss}, Accuracy: {train_accuracy}')
 
         # Validation phase
-        model.eval()
-        val_loss = 0.0
-        val_correct = 0
-        val_total = 0
-
-        with torch.no_grad():
-            for inputs, labels in val_loader:
-                # Move data to device
-                inputs = inputs.to(device)
-                labels = labels.to(device)
-                
-                outputs = model(inputs)
-                loss = loss_fn(outputs, labels)
-
-                val_loss += loss.item()
-                predicted = F.softmax(outputs, dim=1).argmax(dim=1) 
-                val_total += labels.size(0)
-                val_correct += predicted.eq(labels).sum().item()
-
-        val_loss = val_loss / len(val_loader)
-        val_accuracy = 100 * val_correct / val_total
+        val_loss, val_accuracy = validate(model, loss_fn, val_loader, device)
 
         if val_accuracy > best_val_accuracy:
             best_val_accuracy = val_accuracy
@@ -112,10 +168,20 @@ def train(model, optim, schedulers, loss_fn, train_loader, val_loader, num_epoch
             "val_accuracy": val_accuracy,
             "learning_rate": current_lr
         })
+
+    # Intermediate epochs may be scored on a validation subset; the final score uses the full test set
+    if test_loader is not None:
+        test_loss, val_accuracy = validate(model, loss_fn, test_loader, device)
+        print(f'Test Loss: {test_loss}, Test Accuracy: {val_accuracy}')
+        wandb.log({"test_loss": test_loss, "test_accuracy": val_accuracy})
         
     return val_accuracy
 
 def main():
+    parser = argparse.ArgumentParser(description="Train make_net93 with the parameters of config.yml.")
+    parser.add_argument("--dataset", default=config.train_config.dataset, help="cifar10, or the directory of a sharded dataset")
+    args = parser.parse_args()
+
     device = "mps" if torch.backends.mps.is_available() else "cpu"
     device = "cuda" if torch.cuda.is_available() else device
     # device = "cpu"
@@ -136,14 +202,16 @@ def main():
             "widths": net_config.widths,
             "batchnorm_momentum": net_config.batchnorm_momentum,
             "scaling_factor": net_config.scaling_factor,
-            "augmentations": train_config.augmentations
+            "augmentations": train_config.augmentations,
+            "dataset": args.dataset
         }
     )
 
-    model = make_net93(net_config.widths, net_config.batchnorm_momentum, net_config.scaling_factor)
     # Create data loaders
-    train_loader = CifarLoader(DATASET_DIR, train=True, batch_size=train_config.batch_size, aug=train_config.augmentations, device=device)
-    val_loader = CifarLoader(DATASET_DIR, train=False, batch_size=train_config.batch_size, aug=train_config.augmentations, device=device)
+    train_loader = make_train_loader(args.dataset, train_config.batch_size, aug=train_config.augmentations, device=device)
+    val_loader = make_eval_loader(args.dataset, batch_size=train_config.batch_size, device=device)
+    num_classes = len(train_loader.classes)
+    model = make_net93(net_config.widths, net_config.batchnorm_momentum, net_config.scaling_factor, num_classes)
     # Define loss function and optimizer
     loss_fn = torch.nn.CrossEntropyLoss()
     optimizer = torch.optim.SGD(model.parameters(), lr=train_config.learning_rate, weight_decay=train_config.weight_decay)
@@ -155,8 +223,10 @@ def main():
     # Log model architecture to wandb
     wandb.watch(model, log="all")
     
+    micro_batch_size = autotune_micro_batch(model, loss_fn, device, train_config.batch_size, num_classes=num_classes)
+    
     # Train the model
-    train(model, optimizer, schedulers, loss_fn, train_loader, val_loader, train_config.epochs, device)
+    train(model, optimizer, schedulers, loss_fn, train_loader, val_loader, train_config.epochs, device, micro_batch_size=micro_batch_size)
     
     # Finish wandb run
     wandb.finish()